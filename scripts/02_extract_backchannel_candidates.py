@@ -3,14 +3,16 @@
 
 from __future__ import annotations
 
-import os
 import sys
-from pathlib import Path
 
 
 def main() -> None:
-    target = Path(__file__).with_name("extract_backchannels_new.py")
-    os.execv(sys.executable, [sys.executable, str(target), *sys.argv[1:]])
+    # Run in-process instead of exec'ing a fresh interpreter; the script's
+    # own directory is already on sys.path when run as a script.
+    from extract_backchannels_new import main as impl
+
+    sys.argv[0] = "extract_backchannels_new.py"
+    impl()
 
 
 if __name__ == "__main__":
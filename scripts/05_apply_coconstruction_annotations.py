@@ -16,13 +16,20 @@ into MISC of the root token of sentence B.
 from __future__ import annotations
 
 import argparse
-import csv
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import BinaryIO, Dict, Iterable, List, Optional, Set
+
+from conllu_ids import SID_RE, split_blocks
 
 
 YES_VALUES = {"1", "yes", "y", "true"}
+REQUIRED_COLUMNS = ["a_sent_id", "b_sent_id", "coconstruct_deprel", "governor_token_id"]
+ANNOTATION_COLUMNS = {*REQUIRED_COLUMNS, "is_coconstruction"}
+SENT_ID_PREFIX = b"# sent_id = "
+DEFAULT_ANNOTATIONS = Path("output/sst/final_bc_coco/annotations/coconstruction_17_final.xlsx")
+DEFAULT_INPUT = Path("output/sst/sl_sst-ud-merged.backchannels.conllu")
+DEFAULT_OUTPUT = Path("output/sst/final_bc_coco/conllu/sl_sst-ud-merged.conllu")
 
 
 @dataclass
@@ -46,16 +53,38 @@ class SentenceInfo:
     tokens: List[TokenInfo]
 
 
+def _is_annotation_column(name: object) -> bool:
+    return str(name).strip() in ANNOTATION_COLUMNS
+
+
+def _check_columns(columns: Iterable[object]) -> None:
+    # usecols silently drops unknown columns, so a sheet without the
+    # annotation columns would otherwise load as zero rows.
+    present = {str(c).strip() for c in columns}
+    for col in REQUIRED_COLUMNS:
+        if col not in present:
+            raise ValueError(f"Missing required column '{col}' in annotations file")
+
+
 def _load_rows(path: Path) -> List[Dict[str, str]]:
     if path.suffix.lower() in {".xlsx", ".xls"}:
         import pandas as pd  # local import to keep startup light
 
-        df = pd.read_excel(path)
+        try:
+            # Rust-based reader; needs the optional python-calamine package.
+            df = pd.read_excel(path, engine="calamine", usecols=_is_annotation_column)
+        except (ImportError, ValueError):
+            # pandas < 2.2 rejects the engine name with ValueError
+            df = pd.read_excel(path, usecols=_is_annotation_column)
+        _check_columns(df.columns)
         return [{str(k): ("" if v is None else str(v)) for k, v in row.items()} for row in df.to_dict(orient="records")]
 
     if path.suffix.lower() == ".csv":
-        with path.open("r", encoding="utf-8") as f:
-            return list(csv.DictReader(f))
+        import pandas as pd  # local import to keep startup light
+
+        df = pd.read_csv(path, usecols=_is_annotation_column, dtype="string", keep_default_na=False, encoding="utf-8")
+        _check_columns(df.columns)
+        return df.to_dict(orient="records")
 
     raise ValueError(f"Unsupported annotations format: {path}")
 
@@ -72,7 +101,7 @@ def load_coconstructions(path: Path) -> Dict[str, CocoRow]:
             if norm["is_coconstruction"].lower() not in YES_VALUES:
                 continue
 
-        for col in ["a_sent_id", "b_sent_id", "coconstruct_deprel", "governor_token_id"]:
+        for col in REQUIRED_COLUMNS:
             if col not in norm:
                 raise ValueError(f"Missing required column '{col}' in annotations file")
 
@@ -102,142 +131,155 @@ def load_coconstructions(path: Path) -> Dict[str, CocoRow]:
     return ann
 
 
-def parse_sentence_index(lines: List[str]) -> Dict[str, SentenceInfo]:
+def parse_sentence_index(data: bytes, only: Optional[Set[str]] = None) -> Dict[str, SentenceInfo]:
+    """Index sentences by sent_id; if `only` is given, other sentences are skipped."""
     sent_map: Dict[str, SentenceInfo] = {}
-    meta_sid: Optional[str] = None
-    toks: List[TokenInfo] = []
-
-    def flush() -> None:
-        nonlocal meta_sid, toks
-        if meta_sid is None:
-            toks = []
-            return
-        sent_map[meta_sid] = SentenceInfo(sent_id=meta_sid, tokens=toks.copy())
-        meta_sid = None
-        toks = []
-
-    for line in lines:
-        if line == "":
-            flush()
-            continue
 
-        if line.startswith("# sent_id = "):
-            meta_sid = line.split("=", 1)[1].strip()
+    for block in split_blocks(data):
+        m = SID_RE.search(block)
+        if m is None:
             continue
 
-        if line.startswith("#"):
+        sid = m.group(1).decode("utf-8")
+        if only is not None and sid not in only:
             continue
 
-        cols = line.split("\t")
-        if len(cols) != 10:
-            continue
+        toks: List[TokenInfo] = []
+        for line in block.split(b"\n"):
+            if line.startswith(b"#"):
+                continue
 
-        tid = cols[0]
-        if "-" in tid or "." in tid:
-            continue
+            cols = line.rstrip(b"\r").split(b"\t")
+            if len(cols) != 10:
+                continue
 
-        try:
-            tid_i = int(tid)
-        except ValueError:
-            continue
+            tid = cols[0]
+            if b"-" in tid or b"." in tid:
+                continue
+
+            try:
+                tid_i = int(tid)
+            except ValueError:
+                continue
 
-        head = int(cols[6]) if cols[6].isdigit() else None
-        toks.append(TokenInfo(tid=tid_i, head=head, deprel=cols[7]))
+            head = int(cols[6]) if cols[6].isdigit() else None
+            toks.append(TokenInfo(tid=tid_i, head=head, deprel=cols[7].decode("utf-8")))
+
+        sent_map[sid] = SentenceInfo(sent_id=sid, tokens=toks)
 
-    flush()
     return sent_map
 
 
 def validate_references(ann: Dict[str, CocoRow], sents: Dict[str, SentenceInfo]) -> None:
+    # Precompute per-sentence lookups once, only for referenced sentences,
+    # so each annotation row below is a handful of dict/set lookups.
+    a_sids = {row.a_sent_id for row in ann.values()}
+    token_ids: Dict[str, Set[int]] = {
+        sid: {t.tid for t in sents[sid].tokens} for sid in a_sids if sid in sents
+    }
+    root_counts: Dict[str, int] = {
+        sid: sum(1 for t in sents[sid].tokens if t.head == 0 or t.deprel == "root")
+        for sid in ann
+        if sid in sents
+    }
+
     for b_sid, row in ann.items():
         if row.a_sent_id not in sents:
             raise ValueError(f"Missing A sentence in input CoNLL-U: {row.a_sent_id}")
         if b_sid not in sents:
             raise ValueError(f"Missing B sentence in input CoNLL-U: {b_sid}")
 
-        a_ids = {t.tid for t in sents[row.a_sent_id].tokens}
-        if row.governor_token_id not in a_ids:
+        if row.governor_token_id not in token_ids[row.a_sent_id]:
             raise ValueError(
                 f"Governor token {row.governor_token_id} not found in A={row.a_sent_id}"
             )
 
-        roots = [t for t in sents[b_sid].tokens if t.head == 0 or t.deprel == "root"]
-        if len(roots) != 1:
-            raise ValueError(f"B sentence {b_sid} must have exactly one root, found {len(roots)}")
+        if root_counts[b_sid] != 1:
+            raise ValueError(f"B sentence {b_sid} must have exactly one root, found {root_counts[b_sid]}")
 
 
-def apply_annotations(lines: List[str], ann: Dict[str, CocoRow]) -> Tuple[List[str], int]:
-    out: List[str] = []
+def apply_annotations(lines: Iterable[bytes], ann: Dict[str, CocoRow], out: BinaryIO) -> int:
     current_sid: Optional[str] = None
+    active = False
     applied = 0
 
-    for line in lines:
-        if line.startswith("# sent_id = "):
-            current_sid = line.split("=", 1)[1].strip()
-            out.append(line)
+    for raw in lines:
+        # Parse without the line ending but write back whatever the input
+        # used (LF or CRLF); a last line without one gets "\n".
+        line = raw.rstrip(b"\r\n")
+        eol = raw[len(line):] or b"\n"
+        if line.startswith(SENT_ID_PREFIX):
+            current_sid = line[len(SENT_ID_PREFIX):].strip().decode("utf-8")
+            active = current_sid in ann
+            out.write(line + eol)
             continue
 
-        if line.startswith("#") or line == "":
-            out.append(line)
+        # Sentences without an annotation are copied through untouched;
+        # token lines are the only ones starting with a digit.
+        if not active or not line[:1].isdigit():
+            out.write(line + eol)
             continue
 
-        cols = line.split("\t")
+        cols = line.split(b"\t")
         if len(cols) != 10:
-            out.append(line)
+            out.write(line + eol)
             continue
 
         tid = cols[0]
-        if "-" in tid or "." in tid:
-            out.append(line)
+        if b"-" in tid or b"." in tid:
+            out.write(line + eol)
             continue
 
-        if current_sid in ann and cols[6] == "0":
+        if cols[6] == b"0":
             row = ann[current_sid]
-            feature = f"Coconstruct={row.deprel}::{row.a_sent_id}::{row.governor_token_id}"
-            misc = cols[9]
-            if misc == "_":
-                cols[9] = feature
-            elif feature not in misc.split("|"):
-                cols[9] = misc + "|" + feature
-            line = "\t".join(cols)
+            feature = f"Coconstruct={row.deprel}::{row.a_sent_id}::{row.governor_token_id}".encode("utf-8")
+            # Only MISC (the last field) changes; keep the rest of the line as is.
+            prefix, _, misc = line.rpartition(b"\t")
+            if misc == b"_":
+                line = prefix + b"\t" + feature
+            elif feature not in misc.split(b"|"):
+                line = prefix + b"\t" + misc + b"|" + feature
             applied += 1
 
-        out.append(line)
+        out.write(line + eol)
 
-    return out, applied
+    return applied
 
 
 def main() -> None:
     ap = argparse.ArgumentParser(description="Apply coconstruction annotations to CoNLL-U")
     ap.add_argument(
         "--annotations",
-        default="output/sst/final_bc_coco/annotations/coconstruction_17_final.xlsx",
+        type=Path,
+        default=DEFAULT_ANNOTATIONS,
         help="Path to annotated coconstruction sheet (xlsx/csv)",
     )
     ap.add_argument(
         "--input",
-        default="output/sst/sl_sst-ud-merged.backchannels.conllu",
+        type=Path,
+        default=DEFAULT_INPUT,
         help="Input CoNLL-U (typically backchannels-applied merged file)",
     )
     ap.add_argument(
         "--output",
-        default="output/sst/final_bc_coco/conllu/sl_sst-ud-merged.conllu",
+        type=Path,
+        default=DEFAULT_OUTPUT,
         help="Output CoNLL-U with coconstructions applied",
     )
     args = ap.parse_args()
 
-    ann_path = Path(args.annotations)
-    in_path = Path(args.input)
-    out_path = Path(args.output)
+    ann_path = args.annotations
+    in_path = args.input
+    out_path = args.output
 
     ann = load_coconstructions(ann_path)
-    lines = in_path.read_text(encoding="utf-8").splitlines()
-    sents = parse_sentence_index(lines)
+    interesting = set(ann) | {row.a_sent_id for row in ann.values()}
+    sents = parse_sentence_index(in_path.read_bytes(), only=interesting)
     validate_references(ann, sents)
 
-    out_lines, applied = apply_annotations(lines, ann)
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text("\n".join(out_lines) + "\n", encoding="utf-8")
+    with in_path.open("rb") as fin, out_path.open("wb") as fout:
+        applied = apply_annotations(fin, ann, fout)
 
     print(f"Loaded coconstruction rows: {len(ann)}")
     print(f"Applied coconstructions:     {applied}")
@@ -10,80 +10,82 @@ import argparse
 from pathlib import Path
 from typing import Dict, List, Tuple
 
+from conllu_ids import SID_RE, split_blocks
+
+
+DEFAULT_MERGED = Path("output/sst/final_bc_coco/conllu/sl_sst-ud-merged.conllu")
+DEFAULT_SRC_TRAIN = Path("src/sst/sl_sst-ud-train.conllu")
+DEFAULT_SRC_DEV = Path("src/sst/sl_sst-ud-dev.conllu")
+DEFAULT_SRC_TEST = Path("src/sst/sl_sst-ud-test.conllu")
+DEFAULT_OUT_DIR = Path("output/sst/final_bc_coco/conllu")
 
-def parse_blocks(path: Path) -> List[Tuple[str, List[str]]]:
-    blocks: List[List[str]] = []
-    cur: List[str] = []
-
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            if line.strip() == "":
-                if cur:
-                    blocks.append(cur)
-                    cur = []
-            else:
-                cur.append(line)
-        if cur:
-            blocks.append(cur)
-
-    out: List[Tuple[str, List[str]]] = []
-    for b in blocks:
-        sid = None
-        for ln in b:
-            if ln.startswith("# sent_id = "):
-                sid = ln.split("=", 1)[1].strip()
-                break
-        if sid is None:
-            raise ValueError(f"Block without sent_id in {path}")
-        out.append((sid, b))
 
+def parse_blocks(data: bytes, path: Path) -> List[Tuple[str, bytes]]:
+    """Return (sent_id, block) pairs; blocks exclude the trailing newline."""
+    out: List[Tuple[str, bytes]] = []
+    for block in split_blocks(data):
+        m = SID_RE.search(block)
+        if m is None:
+            raise ValueError(f"Block without sent_id in {path}")
+        out.append((m.group(1).decode("utf-8"), block))
     return out
 
 
+def parse_sent_id_order(path: Path) -> List[str]:
+    """Return the sent_id of each block in file order."""
+    return [sid for sid, _ in parse_blocks(path.read_bytes(), path)]
+
+
 def write_split(
     sids: List[str],
-    merged_map: Dict[str, List[str]],
+    merged_map: Dict[str, bytes],
     out_path: Path,
+    eol: bytes = b"\n",
 ) -> None:
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    with out_path.open("w", encoding="utf-8") as out:
-        for sid in sids:
-            out.writelines(merged_map[sid])
-            out.write("\n")
+    sep = eol + eol
+    with out_path.open("wb") as out:
+        if sids:
+            out.write(sep.join([merged_map[sid] for sid in sids]) + sep)
 
 
 def main() -> None:
     ap = argparse.ArgumentParser(description="Split final merged CoNLL-U into train/dev/test")
     ap.add_argument(
         "--merged",
-        default="output/sst/final_bc_coco/conllu/sl_sst-ud-merged.conllu",
+        type=Path,
+        default=DEFAULT_MERGED,
         help="Merged annotated CoNLL-U",
     )
-    ap.add_argument("--src-train", default="src/sst/sl_sst-ud-train.conllu")
-    ap.add_argument("--src-dev", default="src/sst/sl_sst-ud-dev.conllu")
-    ap.add_argument("--src-test", default="src/sst/sl_sst-ud-test.conllu")
+    ap.add_argument("--src-train", type=Path, default=DEFAULT_SRC_TRAIN)
+    ap.add_argument("--src-dev", type=Path, default=DEFAULT_SRC_DEV)
+    ap.add_argument("--src-test", type=Path, default=DEFAULT_SRC_TEST)
     ap.add_argument(
         "--out-dir",
-        default="output/sst/final_bc_coco/conllu",
+        type=Path,
+        default=DEFAULT_OUT_DIR,
         help="Output directory for split files",
     )
     args = ap.parse_args()
 
-    merged_path = Path(args.merged)
-    out_dir = Path(args.out_dir)
+    merged_path = args.merged
+    out_dir = args.out_dir
 
-    merged_blocks = parse_blocks(merged_path)
+    merged_data = merged_path.read_bytes()
+    # Blocks keep their inner line endings, so separate them the same way.
+    eol = b"\r\n" if b"\r\n" in merged_data else b"\n"
+    merged_blocks = parse_blocks(merged_data, merged_path)
     merged_map = {sid: block for sid, block in merged_blocks}
 
     split_inputs = {
-        "train": Path(args.src_train),
-        "dev": Path(args.src_dev),
-        "test": Path(args.src_test),
+        "train": args.src_train,
+        "dev": args.src_dev,
+        "test": args.src_test,
     }
 
     split_sid_orders: Dict[str, List[str]] = {}
     for split, path in split_inputs.items():
-        split_sid_orders[split] = [sid for sid, _ in parse_blocks(path)]
+        split_sid_orders[split] = parse_sent_id_order(path)
 
     # Validate union and disjointness against merged.
     split_sets = {k: set(v) for k, v in split_sid_orders.items()}
@@ -111,7 +113,7 @@ def main() -> None:
     }
 
     for split, sids in split_sid_orders.items():
-        write_split(sids, merged_map, out_paths[split])
+        write_split(sids, merged_map, out_paths[split], eol)
 
     print(f"Merged input: {merged_path}")
     for split in ["train", "dev", "test"]:
@@ -8,82 +8,168 @@ from __future__ import annotations
 
 import argparse
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, compress, count
+from operator import ne
 from pathlib import Path
-from typing import List, Tuple
+from typing import Any, Dict, List, Tuple
+
+from conllu_ids import SID_RE
+
+
+MAX_BAD_SAMPLES = 8
+DEFAULT_SRC_DIR = Path("src/sst")
+DEFAULT_FINAL_DIR = Path("output/sst/final_bc_coco/conllu")
+DEFAULT_REPORT = Path("output/sst/final_bc_coco/reports/diffcheck_src_vs_final.txt")
+
+# compare_pair counts into a plain list indexed by these slots and converts
+# it to a Counter keyed by COUNT_NAMES only once, at the end.
+(
+    MISC_ONLY,
+    ADDED_BACKCHANNEL,
+    ADDED_COCONSTRUCT,
+    MISC_OTHER,
+    TOKEN_COLS_CHANGED,
+    NON_10COL,
+    META_OR_BLANK,
+    LINE_COUNT_MISMATCH,
+    SEQ_MISMATCH,
+    DIFF_LINES,
+) = range(10)
+COUNT_NAMES = (
+    "misc_only_changes",
+    "added_backchannel",
+    "added_coconstruct",
+    "misc_other_change",
+    "token_cols_0_8_changed",
+    "non_10col_token_changed",
+    "meta_or_blank_changed",
+    "line_count_mismatch",
+    "sent_id_sequence_mismatch",
+    "diff_lines",
+)
+
+
+def common_prefix_len(a: bytes, b: bytes, chunk: int = 1 << 20) -> int:
+    """Length of the common byte prefix, compared chunk-wise in C."""
+    ma, mb = memoryview(a), memoryview(b)
+    n = min(len(a), len(b))
+    pos = 0
+    while pos < n:
+        end = min(pos + chunk, n)
+        if ma[pos:end] != mb[pos:end]:
+            break
+        pos = end
+    else:
+        return n
+
+    # Narrow down the differing chunk by halving.
+    while end - pos > 1:
+        mid = (pos + end) // 2
+        if ma[pos:mid] == mb[pos:mid]:
+            pos = mid
+        else:
+            end = mid
+    return pos
 
 
-def compare_pair(src_path: Path, out_path: Path) -> Tuple[Counter, List[Tuple[int, str, str, str]]]:
-    src = src_path.read_text(encoding="utf-8").splitlines()
-    out = out_path.read_text(encoding="utf-8").splitlines()
-    maxlen = max(len(src), len(out))
+def to_counter(c: List[int]) -> Counter:
+    return Counter({name: n for name, n in zip(COUNT_NAMES, c) if n})
+
+
+def count_lines(data: bytes) -> int:
+    return data.count(b"\n") + (1 if data and not data.endswith(b"\n") else 0)
+
+
+def sent_ids(data: bytes) -> List[str]:
+    return [m.decode("utf-8") for m in SID_RE.findall(data)]
+
+
+def compare_pair(src_path: Path, out_path: Path) -> Tuple[Counter, List[Tuple[int, str, str, str]], Dict[str, Any]]:
+    # Each file is read exactly once; line and sentence counts for the
+    # report are returned in `meta` so main() does not re-read them.
+    src_bytes = src_path.read_bytes()
+    out_bytes = out_path.read_bytes()
+    meta: Dict[str, Any] = {
+        "src_lines": count_lines(src_bytes),
+        "out_lines": count_lines(out_bytes),
+        "src_sids": sent_ids(src_bytes),
+        "out_sids": sent_ids(out_bytes),
+    }
 
-    cnt = Counter()
+    c = [0] * len(COUNT_NAMES)
     bad_samples: List[Tuple[int, str, str, str]] = []
+    skipped = 0
 
-    src_sids = [ln.split("=", 1)[1].strip() for ln in src if ln.startswith("# sent_id = ")]
-    out_sids = [ln.split("=", 1)[1].strip() for ln in out if ln.startswith("# sent_id = ")]
-    if src_sids != out_sids:
-        cnt["sent_id_sequence_mismatch"] += 1
+    def add_bad(kind: int, i: int, a: str, b: str) -> None:
+        c[kind] += 1
+        if len(bad_samples) < MAX_BAD_SAMPLES:
+            bad_samples.append((skipped + i + 1, COUNT_NAMES[kind], a, b))
 
-    for i in range(maxlen):
+    if meta["src_sids"] != meta["out_sids"]:
+        c[SEQ_MISMATCH] += 1
+
+    # Common case: nothing was added at all.
+    if src_bytes == out_bytes:
+        return to_counter(c), bad_samples, meta
+
+    # Lines before the first differing byte are identical; only decode and
+    # classify from the first differing line onwards.
+    cut = src_bytes.rfind(b"\n", 0, common_prefix_len(src_bytes, out_bytes)) + 1
+    skipped = src_bytes.count(b"\n", 0, cut)
+
+    src = src_bytes[cut:].decode("utf-8").splitlines()
+    out = out_bytes[cut:].decode("utf-8").splitlines()
+    del src_bytes, out_bytes
+    maxlen = max(len(src), len(out))
+
+    # Find differing line indices at C speed (map/compress never enter the
+    # interpreter per line); only those lines are classified below.
+    differing = compress(count(), map(ne, src, out))
+    for i in chain(differing, range(min(len(src), len(out)), maxlen)):
         a = src[i] if i < len(src) else None
         b = out[i] if i < len(out) else None
-        if a == b:
-            continue
 
-        cnt["diff_lines"] += 1
+        c[DIFF_LINES] += 1
 
         if a is None or b is None:
-            cnt["line_count_mismatch"] += 1
-            if len(bad_samples) < 8:
-                bad_samples.append((i + 1, "line_count_mismatch", str(a), str(b)))
+            add_bad(LINE_COUNT_MISMATCH, i, str(a), str(b))
             continue
 
         if a.startswith("#") or b.startswith("#") or a == "" or b == "":
-            cnt["meta_or_blank_changed"] += 1
-            if len(bad_samples) < 8:
-                bad_samples.append((i + 1, "meta_or_blank_changed", a, b))
+            add_bad(META_OR_BLANK, i, a, b)
             continue
 
         ac = a.split("\t")
         bc = b.split("\t")
         if len(ac) != 10 or len(bc) != 10:
-            cnt["non_10col_token_changed"] += 1
-            if len(bad_samples) < 8:
-                bad_samples.append((i + 1, "non_10col_token_changed", a, b))
+            add_bad(NON_10COL, i, a, b)
             continue
 
-        if all(ac[j] == bc[j] for j in range(9)) and ac[9] != bc[9]:
-            cnt["misc_only_changes"] += 1
-            if "Backchannel=" in bc[9] and "Backchannel=" not in ac[9]:
-                cnt["added_backchannel"] += 1
-            if "Coconstruct=" in bc[9] and "Coconstruct=" not in ac[9]:
-                cnt["added_coconstruct"] += 1
-            if not (
-                ("Backchannel=" in bc[9] and "Backchannel=" not in ac[9])
-                or ("Coconstruct=" in bc[9] and "Coconstruct=" not in ac[9])
-            ):
-                cnt["misc_other_change"] += 1
-                if len(bad_samples) < 8:
-                    bad_samples.append((i + 1, "misc_other_change", a, b))
+        if ac[:9] == bc[:9] and ac[9] != bc[9]:
+            c[MISC_ONLY] += 1
+            added_bc = "Backchannel=" in bc[9] and "Backchannel=" not in ac[9]
+            added_co = "Coconstruct=" in bc[9] and "Coconstruct=" not in ac[9]
+            c[ADDED_BACKCHANNEL] += added_bc
+            c[ADDED_COCONSTRUCT] += added_co
+            if not (added_bc or added_co):
+                add_bad(MISC_OTHER, i, a, b)
         else:
-            cnt["token_cols_0_8_changed"] += 1
-            if len(bad_samples) < 8:
-                bad_samples.append((i + 1, "token_cols_0_8_changed", a, b))
+            add_bad(TOKEN_COLS_CHANGED, i, a, b)
 
-    return cnt, bad_samples
+    return to_counter(c), bad_samples, meta
 
 
 def main() -> None:
     ap = argparse.ArgumentParser(description="Strict diff check: src vs final CoNLL-U files")
-    ap.add_argument("--src-dir", default="src/sst")
-    ap.add_argument("--final-dir", default="output/sst/final_bc_coco/conllu")
-    ap.add_argument("--report", default="output/sst/final_bc_coco/reports/diffcheck_src_vs_final.txt")
+    ap.add_argument("--src-dir", type=Path, default=DEFAULT_SRC_DIR)
+    ap.add_argument("--final-dir", type=Path, default=DEFAULT_FINAL_DIR)
+    ap.add_argument("--report", type=Path, default=DEFAULT_REPORT)
     args = ap.parse_args()
 
-    src_dir = Path(args.src_dir)
-    final_dir = Path(args.final_dir)
-    report = Path(args.report)
+    src_dir = args.src_dir
+    final_dir = args.final_dir
+    report = args.report
     report.parent.mkdir(parents=True, exist_ok=True)
 
     pairs = [
@@ -96,8 +182,11 @@ def main() -> None:
     out_lines: List[str] = []
     overall_ok = True
 
-    for name, srcp, outp in pairs:
-        cnt, bad = compare_pair(srcp, outp)
+    # The pairs are independent; ex.map keeps results in report order.
+    with ProcessPoolExecutor(max_workers=len(pairs)) as ex:
+        results = list(ex.map(compare_pair, [p[1] for p in pairs], [p[2] for p in pairs]))
+
+    for (name, srcp, outp), (cnt, bad, meta) in zip(pairs, results):
         unexpected = (
             cnt["line_count_mismatch"]
             + cnt["meta_or_blank_changed"]
@@ -109,15 +198,13 @@ def main() -> None:
         ok = unexpected == 0
         overall_ok = overall_ok and ok
 
-        src_lines = srcp.read_text(encoding="utf-8").splitlines()
-        out_lines_file = outp.read_text(encoding="utf-8").splitlines()
-        src_sids = [ln for ln in src_lines if ln.startswith("# sent_id = ")]
-        out_sids = [ln for ln in out_lines_file if ln.startswith("# sent_id = ")]
+        src_sids = meta["src_sids"]
+        out_sids = meta["out_sids"]
 
         out_lines.append(f"[{name}]")
         out_lines.append(f"- src: {srcp}")
         out_lines.append(f"- out: {outp}")
-        out_lines.append(f"- line counts src/out: {len(src_lines)}/{len(out_lines_file)}")
+        out_lines.append(f"- line counts src/out: {meta['src_lines']}/{meta['out_lines']}")
         out_lines.append(f"- sentence counts src/out: {len(src_sids)}/{len(out_sids)}")
         out_lines.append(f"- sent_id sequence identical: {src_sids == out_sids}")
         out_lines.append(f"- total diff lines: {cnt['diff_lines']}")
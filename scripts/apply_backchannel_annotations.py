@@ -11,82 +11,98 @@ Format: Backchannel=A_sent_id::root_token_id
 """
 
 import argparse
-import csv
 from pathlib import Path
-from typing import Dict, List, Tuple, Set
+from typing import BinaryIO, Dict, Iterable, List, Optional, Set
 
 
-def parse_conllu_line(line: str) -> Tuple[str, List[str]]:
-    """Parse a CoNLL-U line and return (token_id, fields).
-    
-    Returns:
-        - token_id as string (e.g., '1', '2-3', '1.1')
-        - list of 10 fields
-    """
-    if not line.strip() or line.startswith('#'):
-        return None, None
-    
-    fields = line.split('\t')
-    if len(fields) != 10:
-        return None, None
-    
-    return fields[0], fields
+SENT_ID_PREFIX = b'# sent_id = '
+
 
+def parse_sent_id(line: bytes) -> str:
+    """Return the sentence ID from a '# sent_id = ' line."""
+    return line[len(SENT_ID_PREFIX):].strip().decode('utf-8')
 
-def read_conllu(filepath: Path) -> List[str]:
-    """Read CoNLL-U file and return list of lines (preserving exact format)."""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return f.readlines()
+
+def is_token_line(line: bytes) -> bool:
+    """Check whether a CoNLL-U line is a 10-column token line.
+    
+    Token lines start with a digit, so the first byte rejects comments and
+    blank lines before any tab counting is done.
+    """
+    return line[:1].isdigit() and line.count(b'\t') == 9
 
 
-def find_root_token_id(lines: List[str], sent_id: str) -> str:
-    """Find the token ID of the root token in a sentence.
+def build_root_index(lines: Iterable[bytes], only: Optional[Set[str]] = None) -> Dict[str, str]:
+    """Map every sentence ID to the token ID of its root token.
+    
+    Makes a single pass over the file instead of re-scanning it for every
+    candidate.
     
     Args:
-        lines: All lines from CoNLL-U file
-        sent_id: Sentence ID to search for (e.g., 'Gos073.s374')
+        lines: Lines of a CoNLL-U file as bytes (a binary file handle works)
+        only: If given, only these sentence IDs are indexed
     
     Returns:
-        Token ID of root token (e.g., '11')
+        Dict mapping sent_id (e.g., 'Gos073.s374') to root token ID (e.g., '11')
     """
-    in_target_sentence = False
+    root_index = {}
+    current_sent_id = None
     
     for line in lines:
-        if line.startswith('# sent_id = '):
-            current_sent_id = line.strip().split('= ')[1]
-            in_target_sentence = (current_sent_id == sent_id)
+        if line.startswith(SENT_ID_PREFIX):
+            current_sent_id = parse_sent_id(line)
+            if only is not None and current_sent_id not in only:
+                current_sent_id = None
             continue
         
-        if in_target_sentence:
-            tid, fields = parse_conllu_line(line)
-            if tid and fields:
-                # Check if HEAD=0 (root)
-                head = fields[6]
-                if head == '0':
-                    return tid
-            
+        # Skip the rest of a sentence once its root is known
+        if current_sent_id is None:
+            continue
+        
+        if not line[:1].isdigit():
             # Empty line means end of sentence
             if not line.strip():
-                break
+                current_sent_id = None
+            continue
+        
+        fields = line.split(b'\t', 9)
+        if len(fields) != 10:
+            continue
+        
+        tid = fields[0]
+        if b'-' in tid or b'.' in tid:
+            continue
+        
+        # Check if HEAD=0 (root); first occurrence of a sent_id wins
+        if fields[6] == b'0':
+            root_index.setdefault(current_sent_id, tid.decode('ascii'))
+            current_sent_id = None
     
-    return None
+    return root_index
 
 
 def load_backchannel_candidates(csv_path: Path) -> List[Dict]:
     """Load CSV and filter to task criteria.
     
+    Only the four columns needed here are parsed; filtering is a vectorized
+    mask rather than a per-row Python check.
+    
     Returns list of candidates where A_is_question=0 AND B_all_in_lexicon=1
     """
-    candidates = []
+    import pandas as pd  # local import to keep startup light
     
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            # Apply task filter
-            if row['A_is_question'] == '0' and row['B_all_in_lexicon'] == '1':
-                candidates.append(row)
+    df = pd.read_csv(
+        csv_path,
+        usecols=['A_sent_id', 'B_sent_id', 'A_is_question', 'B_all_in_lexicon'],
+        dtype='string',
+        keep_default_na=False,
+        encoding='utf-8',
+    )
     
-    return candidates
+    # Apply task filter
+    df = df[(df['A_is_question'] == '0') & (df['B_all_in_lexicon'] == '1')]
+    
+    return df[['A_sent_id', 'B_sent_id']].to_dict('records')
 
 
 def add_backchannel_to_misc(misc_value: str, backchannel_ref: str) -> str:
@@ -97,37 +113,42 @@ def add_backchannel_to_misc(misc_value: str, backchannel_ref: str) -> str:
         backchannel_ref: The backchannel reference (e.g., 'Gos073.s374::11')
     
     Returns:
-        Updated MISC value
+        Updated MISC value (unchanged if the annotation is already present)
     """
     backchannel_annotation = f'Backchannel={backchannel_ref}'
     
     if misc_value == '_':
         return backchannel_annotation
+    elif backchannel_annotation in misc_value.split('|'):
+        # Already annotated (e.g. re-running on annotated output)
+        return misc_value
     else:
         # Append to existing features
         return f'{misc_value}|{backchannel_annotation}'
 
 
-def apply_annotations(conllu_lines: List[str], candidates: List[Dict]) -> Tuple[List[str], Dict]:
-    """Apply backchannel annotations to CoNLL-U lines.
+def build_backchannel_map(input_path: Path, candidates: List[Dict]) -> Dict[str, str]:
+    """Resolve candidates to Backchannel= references.
     
     Args:
-        conllu_lines: Original lines from CoNLL-U file
+        input_path: CoNLL-U file holding the A utterances
         candidates: Backchannel candidates to annotate
     
     Returns:
-        - Modified lines (with annotations added)
-        - Statistics dict
+        Dict mapping B_sent_id to 'A_sent_id::root_token_id'
     """
-    # Build index: B_sent_id -> (A_sent_id, root_token_id)
+    # Several B utterances may respond to the same A; look each A up once
     backchannel_map = {}
+    a_needed = {candidate['A_sent_id'] for candidate in candidates}
+    with open(input_path, 'rb') as f:
+        root_index = build_root_index(f, only=a_needed)
     
     for candidate in candidates:
         b_sent_id = candidate['B_sent_id']
         a_sent_id = candidate['A_sent_id']
         
         # Find root token in utterance A
-        root_token_id = find_root_token_id(conllu_lines, a_sent_id)
+        root_token_id = root_index.get(a_sent_id)
         
         if root_token_id:
             backchannel_ref = f'{a_sent_id}::{root_token_id}'
@@ -135,53 +156,64 @@ def apply_annotations(conllu_lines: List[str], candidates: List[Dict]) -> Tuple[
         else:
             print(f'WARNING: Could not find root token for {a_sent_id}')
     
-    # Apply annotations
-    modified_lines = []
+    return backchannel_map
+
+
+def apply_annotations(lines: Iterable[bytes], backchannel_map: Dict[str, str], out: BinaryIO) -> Dict:
+    """Apply backchannel annotations, writing each line to `out` as it is read.
+    
+    Args:
+        lines: Lines of the original CoNLL-U file as bytes
+        backchannel_map: B_sent_id -> backchannel reference
+        out: Binary output handle
+    
+    Returns:
+        Dict with the number of lines read and sentences annotated
+    """
     current_sent_id = None
     first_token_in_sentence = True
     annotated_count = 0
+    line_count = 0
+    # bound once: called for every line of the corpus
+    write = out.write
     
-    for line in conllu_lines:
+    for line in lines:
+        line_count += 1
+        
         # Track current sentence
-        if line.startswith('# sent_id = '):
-            current_sent_id = line.strip().split('= ')[1]
+        if line.startswith(SENT_ID_PREFIX):
+            current_sent_id = parse_sent_id(line)
             first_token_in_sentence = True
-            modified_lines.append(line)
+            write(line)
             continue
         
-        # Parse token line
-        tid, fields = parse_conllu_line(line)
-        
-        if tid and fields and first_token_in_sentence:
+        if first_token_in_sentence and is_token_line(line):
             # Check if this sentence needs annotation
             if current_sent_id in backchannel_map:
                 backchannel_ref = backchannel_map[current_sent_id]
                 
-                # Modify MISC column (index 9)
-                fields[9] = add_backchannel_to_misc(fields[9].strip(), backchannel_ref)
-                
-                # Reconstruct line
-                modified_line = '\t'.join(fields) + '\n'
-                modified_lines.append(modified_line)
+                # Modify MISC column (last field) without re-joining the others;
+                # the line keeps its original ending (LF or CRLF)
+                body = line.rstrip(b'\r\n')
+                prefix, _, misc = body.rpartition(b'\t')
+                new_misc = add_backchannel_to_misc(misc.strip().decode('utf-8'), backchannel_ref)
+                write(prefix)
+                write(b'\t')
+                write(new_misc.encode('utf-8'))
+                write(line[len(body):] or b'\n')
                 annotated_count += 1
             else:
-                modified_lines.append(line)
+                write(line)
             
             first_token_in_sentence = False
         else:
-            modified_lines.append(line)
+            write(line)
             
-            # Reset on empty line
-            if not line.strip():
+            # Reset on empty line (isspace() avoids allocating a stripped copy)
+            if line.isspace():
                 first_token_in_sentence = True
     
-    stats = {
-        'total_candidates': len(candidates),
-        'found_roots': len(backchannel_map),
-        'annotated': annotated_count
-    }
-    
-    return modified_lines, stats
+    return {'lines': line_count, 'annotated': annotated_count}
 
 
 def main():
@@ -211,12 +243,21 @@ def main():
     candidates = load_backchannel_candidates(csv_path)
     print(f'Loaded {len(candidates)} candidates (A_is_question=0 & B_all_in_lexicon=1)')
     
-    print(f'\nReading CoNLL-U from {input_path}')
-    conllu_lines = read_conllu(input_path)
-    print(f'Read {len(conllu_lines)} lines')
+    backchannel_map = build_backchannel_map(input_path, candidates)
     
-    print(f'\nApplying annotations...')
-    modified_lines, stats = apply_annotations(conllu_lines, candidates)
+    print(f'\nApplying annotations to {input_path}')
+    print(f'Writing output to {output_path}')
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(input_path, 'rb', buffering=1 << 20) as fin, \
+            open(output_path, 'wb', buffering=1 << 20) as fout:
+        counts = apply_annotations(fin, backchannel_map, fout)
+    print(f'Read {counts["lines"]} lines')
+    
+    stats = {
+        'total_candidates': len(candidates),
+        'found_roots': len(backchannel_map),
+        'annotated': counts['annotated']
+    }
     
     print(f'\nStatistics:')
     print(f'  Total candidates: {stats["total_candidates"]}')
@@ -226,11 +267,6 @@ def main():
     if stats['annotated'] != stats['total_candidates']:
         print(f'\nWARNING: Not all candidates were annotated!')
     
-    print(f'\nWriting output to {output_path}')
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.writelines(modified_lines)
-    
     print(f'\nDone! Annotated {stats["annotated"]} backchannels.')
     print(f'\nNext step: Verify with diff that only MISC column changed:')
     print(f'  diff -u {input_path} {output_path} | head -100')
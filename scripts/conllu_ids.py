@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+CoNLL-U patterns shared by the bytes-level workflow steps (05, 06, 07).
+"""
+
+from __future__ import annotations
+
+import re
+from typing import List
+
+
+# Value of a "# sent_id = ..." comment with surrounding blanks (and a CR from
+# CRLF input) stripped, like the str.strip() the text-mode parsers applied.
+SID_RE = re.compile(rb"(?m)^# sent_id = [ \t]*(.*?)[ \t\r]*$")
+# Sentence blocks are separated by one or more blank lines. The pattern starts
+# with a literal "\n" so the regex engine can skip straight to candidates;
+# the CR of a CRLF line before the separator stays on the block.
+BLOCK_SEP_RE = re.compile(rb"\n(?:[ \t]*\r?\n)+")
+
+
+def split_blocks(data: bytes) -> List[bytes]:
+    """Split CoNLL-U bytes into sentence blocks without their trailing line ending."""
+    data = data.strip(b"\r\n")
+    if not data:
+        return []
+    blocks = BLOCK_SEP_RE.split(data)
+    if b"\r" in data:
+        blocks = [b[:-1] if b.endswith(b"\r") else b for b in blocks]
+    return blocks
@@ -18,12 +18,20 @@ from __future__ import annotations
 
 import argparse
 import csv
-from dataclasses import dataclass
+import sys
+from collections import deque
+from dataclasses import dataclass, field
+from itertools import chain
+from operator import itemgetter
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Deque, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
 
-@dataclass
-class Token:
+# byte constants for the CoNLL-U scanner
+HASH = ord("#")
+EQ = b"="
+TAB = b"\t"
+
+class Token(NamedTuple):
     tid: int
     form: str
     lemma: str
@@ -32,7 +40,7 @@ class Token:
     deprel: str
     misc: str
 
-@dataclass
+@dataclass(slots=True)
 class Sent:
     doc: str
     sent_id: str
@@ -40,6 +48,14 @@ class Sent:
     text: str
     sound_url: str
     tokens: List[Token]
+    # Non-punctuation tokens and their normalized forms, computed once per
+    # sentence; the helpers below all work on these.
+    nonpunct: List[Token] = field(init=False, repr=False)
+    forms_lc: List[str] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.nonpunct = [t for t in self.tokens if not is_punct(t)]
+        self.forms_lc = [sys.intern(norm_form(t.form)) for t in self.nonpunct]
 
 def load_lexicon_from_file(path: Path) -> Tuple[set[str], Dict[str, str]]:
     """Load lexicon from file with categories.
@@ -77,70 +93,61 @@ def load_lexicon_from_file(path: Path) -> Tuple[set[str], Dict[str, str]]:
                         categories[word] = 'unspecified'
     return lexicon, categories
 
-def parse_conllu(path: Path) -> List[Sent]:
-    """Parse CoNLL-U file and return list of sentences."""
-    sents: List[Sent] = []
+def iter_conllu(path: Path) -> Iterator[Sent]:
+    """Parse CoNLL-U file, yielding one sentence at a time."""
     meta: Dict[str, str] = {}
     tokens: List[Token] = []
     current_doc: str = ""
+    # bound once: the token branch below runs for every line of the corpus
+    intern = sys.intern
 
-    def flush():
-        nonlocal meta, tokens, current_doc
-        if not meta and not tokens:
-            return
-        if "newdoc id" in meta:
-            current_doc = meta["newdoc id"]
-        sent_id = meta.get("sent_id", "")
-        speaker = meta.get("speaker_id", "")
-        text = meta.get("text", "")
-        sound_url = meta.get("sound_url", "NA")
-        sents.append(Sent(doc=current_doc, sent_id=sent_id, speaker=speaker, 
-                         text=text, sound_url=sound_url, tokens=tokens))
-        meta = {}
-        tokens = []
-
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.rstrip("\n")
+    with path.open("rb") as f:
+        # the trailing empty line flushes a last sentence without a blank line after it;
+        # lines stay bytes and only the kept columns are decoded
+        for line in chain(f, (b"\n",)):
+            line = line.rstrip(b"\r\n")
             if not line:
-                flush()
+                if not meta and not tokens:
+                    continue
+                if "newdoc id" in meta:
+                    current_doc = sys.intern(meta["newdoc id"])
+                sent_id = meta.get("sent_id", "")
+                speaker = sys.intern(meta.get("speaker_id", ""))
+                text = meta.get("text", "")
+                sound_url = meta.get("sound_url", "NA")
+                yield Sent(doc=current_doc, sent_id=sent_id, speaker=speaker,
+                           text=text, sound_url=sound_url, tokens=tokens)
+                meta = {}
+                tokens = []
                 continue
-            if line.startswith("#"):
-                if "=" in line:
-                    k, v = line[1:].split("=", 1)
+            if line[0] == HASH:
+                if EQ in line:
+                    k, v = line[1:].decode("utf-8").split("=", 1)
                     meta[k[1:].strip()] = v.strip()
                 continue
 
-            cols = line.split("\t")
+            cols = line.split(TAB, 9)
             if len(cols) < 8:
                 continue
             tid = cols[0]
-            # skip multiword tokens & empty nodes
-            if "-" in tid or "." in tid:
-                continue
-            try:
-                tid_i = int(tid)
-            except ValueError:
+            # skip multiword tokens ("1-2") & empty nodes ("1.1")
+            if not tid.isdigit():
                 continue
 
-            head = None
-            if cols[6].isdigit():
+            # HEAD is numeric for every regular token; "_" is the rare exception
+            try:
                 head = int(cols[6])
+            except ValueError:
+                head = None
 
-            misc = cols[9] if len(cols) > 9 else "_"
+            misc = cols[9].decode("utf-8") if len(cols) > 9 else "_"
+            # Token(tid, form, lemma, upos, head, deprel, misc)
             tokens.append(Token(
-                tid=tid_i,
-                form=cols[1],
-                lemma=cols[2],
-                upos=cols[3],
-                head=head,
-                deprel=cols[7],
-                misc=misc
+                int(tid), cols[1].decode("utf-8"), cols[2].decode("utf-8"),
+                intern(cols[3].decode("utf-8")), head,
+                intern(cols[7].decode("utf-8")), misc
             ))
 
-    flush()
-    return sents
-
 def is_punct(tok: Token) -> bool:
     """Check if token is punctuation."""
     return tok.upos == "PUNCT"
@@ -151,66 +158,38 @@ def norm_form(s: str) -> str:
 
 def normalize_token_sequence(sent: Sent) -> str:
     """Normalize sentence non-punctuation tokens into a space-joined phrase."""
-    forms = [norm_form(t.form) for t in sent.tokens if not is_punct(t)]
-    return " ".join(forms)
+    return " ".join(sent.forms_lc)
 
 def get_first_nonpunct_token(sent: Sent) -> Optional[Token]:
     """Get first non-punctuation token from sentence."""
-    for tok in sent.tokens:
-        if not is_punct(tok):
-            return tok
-    return None
+    return sent.nonpunct[0] if sent.nonpunct else None
 
 def is_question_like(text: str) -> bool:
     """Check if text ends with question mark."""
     t = (text or "").strip()
     return "?" in t
 
-def all_tokens_in_lexicon(sent: Sent, lex: set[str]) -> bool:
-    """Check if all non-punctuation tokens are in lexicon."""
-    toks = [t for t in sent.tokens if not is_punct(t)]
-    if not toks:
-        return False
-    forms = [norm_form(t.form) for t in toks]
-    return all(f in lex for f in forms)
-
-def check_speaker_continues(sents: List[Sent], current_idx: int, current_speaker: str) -> bool:
+def check_speaker_continues(current: Sent, next_sent: Optional[Sent], current_speaker: str) -> bool:
     """Check if current_speaker continues speaking in the next utterance.
     
     Args:
-        sents: List of all sentences
-        current_idx: Index of current utterance
+        current: Current utterance
+        next_sent: Utterance following it (None at the end of the corpus)
         current_speaker: Speaker to check for continuation
     
     Returns:
         True if the next utterance is by the same speaker in the same document
     """
-    if current_idx + 1 >= len(sents):
+    if next_sent is None:
         return False
     
-    next_sent = sents[current_idx + 1]
-    current_doc = sents[current_idx].doc
-    
     # Check if next utterance is in same document and by same speaker
-    return next_sent.doc == current_doc and next_sent.speaker == current_speaker
-
-def has_verbal_backchannel(sent: Sent, lex: set[str]) -> bool:
-    """Check if sentence contains a verbal backchannel at any position.
-    
-    Returns True if found, False otherwise.
-    """
-    for tok in sent.tokens:
-        if is_punct(tok):
-            continue
-        form_lower = norm_form(tok.form)
-        if tok.upos == 'VERB' and form_lower in lex:
-            return True
-    return False
+    return next_sent.doc == current.doc and next_sent.speaker == current_speaker
 
 def matches_criteria(
     first_tok: Token,
     sent: Sent,
-    lex: set[str],
+    lex: frozenset[str],
     categories: Dict[str, str],
 ) -> Tuple[bool, str]:
     """Check if first token matches all extraction criteria.
@@ -218,7 +197,8 @@ def matches_criteria(
     Returns:
         (matches, reason) tuple
     """
-    form_lower = norm_form(first_tok.form)
+    # first_tok is sent.nonpunct[0], whose normalized form is cached
+    form_lower = sent.forms_lc[0]
     
     # Criterion 1: Must be in lexicon
     if form_lower not in lex:
@@ -233,11 +213,11 @@ def matches_criteria(
     
     if is_multiword_starter:
         # For multiword starters, require second token to also be in lexicon
-        non_punct_tokens = [t for t in sent.tokens if not is_punct(t)]
+        non_punct_tokens = sent.nonpunct
         if len(non_punct_tokens) < 2:
             return False, "multiword_starter but no second token"
         second_tok = non_punct_tokens[1]
-        second_form_lower = norm_form(second_tok.form)
+        second_form_lower = sent.forms_lc[1]
         if second_form_lower not in lex:
             return False, f"multiword_starter but second token '{second_tok.form}' not in lexicon"
     else:
@@ -281,112 +261,12 @@ def main():
         return
     
     print(f"Loaded {len(lex)} lexicon words from {lexicon_path}")
+    lex = frozenset(map(sys.intern, lex))
     
-    # Parse CoNLL-U
+    # Parse CoNLL-U and extract candidates in one pass. Only A, B and the
+    # utterance after B are ever looked at, so sentences are streamed through
+    # a three-slot window instead of being parsed into a list first.
     path = Path(args.input)
-    sents = parse_conllu(path)
-    print(f"Parsed {len(sents)} sentences from {path}")
-    
-    # Extract candidates
-    candidates = []
-    
-    for i in range(1, len(sents)):
-        A = sents[i - 1]
-        B = sents[i]
-        
-        # Basic checks
-        if A.doc != B.doc:
-            continue
-        if not A.sent_id or not B.sent_id:
-            continue
-        if not A.speaker or not B.speaker:
-            continue
-        if A.speaker == B.speaker:
-            continue  # backchannels are other-speaker
-        
-        # Get first non-punctuation token from B
-        first_tok = get_first_nonpunct_token(B)
-        if first_tok is None:
-            continue
-        
-        # Check if it matches all criteria
-        matches, reason = matches_criteria(first_tok, B, lex, categories)
-        
-        if matches:
-            # Check lexicon coverage (now a soft filter indicator)
-            B_all_in_lex = all_tokens_in_lexicon(B, lex)
-            
-            # Get category from first token
-            form_lower = norm_form(first_tok.form)
-            bc_type = categories.get(form_lower, 'unspecified')
-            
-            # Get all token forms and POS tags from B
-            B_forms = []
-            B_pos = []
-            for tok in B.tokens:
-                if not is_punct(tok):
-                    B_forms.append(tok.form)
-                    B_pos.append(tok.upos)
-            
-            # Get A tokens for context
-            A_forms = []
-            A_pos = []
-            for tok in A.tokens:
-                if not is_punct(tok):
-                    A_forms.append(tok.form)
-                    A_pos.append(tok.upos)
-            
-            # Check warning flags
-            A_is_question = is_question_like(A.text)
-            B_has_verbal_bc = has_verbal_backchannel(B, lex)
-            not_all_in_lex = not B_all_in_lex
-            A_continues = check_speaker_continues(sents, i, A.speaker)
-            
-            # Build warnings list
-            warnings = []
-            if A_is_question:
-                warnings.append("a_is_question")
-            # Positive indicator: has verbal backchannel (e.g., "ja razumem", "ne vem")
-            if B_has_verbal_bc:
-                warnings.append("has_verbal_bc")
-            # Flag cases where not all tokens are in lexicon (continuation evidence)
-            if not_all_in_lex:
-                warnings.append("not_all_in_lexicon")
-            # Positive indicator: A continues speaking (B didn't take the floor)
-            if A_continues:
-                warnings.append("a_continues")
-            
-            warnings_str = "; ".join(warnings) if warnings else "ok"
-            
-            candidates.append({
-                "doc": B.doc,
-                "A_sent_id": A.sent_id,
-                "A_speaker": A.speaker,
-                "A_text": A.text,
-                "A_sound_url": A.sound_url,
-                "A_tokens": " ".join(A_forms),
-                "A_pos_tags": " ".join(A_pos),
-                "B_sent_id": B.sent_id,
-                "B_speaker": B.speaker,
-                "B_text": B.text,
-                "B_sound_url": B.sound_url,
-                "B_tokens": " ".join(B_forms),
-                "B_pos_tags": " ".join(B_pos),
-                "first_token_form": first_tok.form,
-                "first_token_lemma": first_tok.lemma,
-                "first_token_upos": first_tok.upos,
-                "first_token_deprel": first_tok.deprel,
-                "backchannel_type": bc_type,
-                "B_token_count": len(B_forms),
-                "B_has_verbal_bc": int(B_has_verbal_bc),
-                "B_all_in_lexicon": int(B_all_in_lex),
-                "A_is_question": int(A_is_question),
-                "A_continues": int(A_continues),
-                "warnings": warnings_str,
-                "keep?": "",
-            })
-    
-    # Write CSV
     out = Path(args.output)
     fieldnames = [
         "doc", "A_sent_id", "A_speaker", "A_text", "A_sound_url", 
@@ -400,13 +280,121 @@ def main():
         "keep?"
     ]
     
+    # Rows are written as soon as they are found, so no candidate list is kept
+    row_values = itemgetter(*fieldnames)
+    n_candidates = 0
+    n_sents = 0
+    window: Deque[Optional[Sent]] = deque([None, None], maxlen=3)
+    
     with out.open("w", encoding="utf-8", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-        for row in candidates:
-            w.writerow(row)
+        w = csv.writer(f)
+        w.writerow(fieldnames)
+        for sent in chain(iter_conllu(path), (None,)):
+            window.append(sent)
+            if sent is not None:
+                n_sents += 1
+            A, B, C = window
+            if A is None or B is None:
+                continue
+        
+            # Most selective test first: B's first non-punct token must be in the
+            # lexicon (criterion 1), an O(1) check on the cached forms
+            if not B.forms_lc or B.forms_lc[0] not in lex:
+                continue
+        
+            # Basic checks
+            if A.doc != B.doc:
+                continue
+            if not A.sent_id or not B.sent_id:
+                continue
+            if not A.speaker or not B.speaker:
+                continue
+            if A.speaker == B.speaker:
+                continue  # backchannels are other-speaker
+        
+            # Get first non-punctuation token from B
+            first_tok = get_first_nonpunct_token(B)
+            if first_tok is None:
+                continue
+        
+            # Check if it matches all criteria
+            matches, reason = matches_criteria(first_tok, B, lex, categories)
+        
+            if matches:
+                # Get category from first token
+                form_lower = B.forms_lc[0]
+                bc_type = categories.get(form_lower, 'unspecified')
+            
+                # Single pass over B: forms/POS for output, plus lexicon
+                # coverage (soft filter indicator) and verbal backchannel flag
+                B_forms = []
+                B_pos = []
+                B_all_in_lex = True
+                B_has_verbal_bc = False
+                for tok, form_lc in zip(B.nonpunct, B.forms_lc):
+                    B_forms.append(tok.form)
+                    B_pos.append(tok.upos)
+                    if form_lc not in lex:
+                        B_all_in_lex = False
+                    elif tok.upos == 'VERB':
+                        B_has_verbal_bc = True
+            
+                # Get A tokens for context
+                A_forms = [tok.form for tok in A.nonpunct]
+                A_pos = [tok.upos for tok in A.nonpunct]
+            
+                # Check warning flags
+                A_is_question = is_question_like(A.text)
+                not_all_in_lex = not B_all_in_lex
+                A_continues = check_speaker_continues(B, C, A.speaker)
+            
+                # Build warnings list
+                warnings = []
+                if A_is_question:
+                    warnings.append("a_is_question")
+                # Positive indicator: has verbal backchannel (e.g., "ja razumem", "ne vem")
+                if B_has_verbal_bc:
+                    warnings.append("has_verbal_bc")
+                # Flag cases where not all tokens are in lexicon (continuation evidence)
+                if not_all_in_lex:
+                    warnings.append("not_all_in_lexicon")
+                # Positive indicator: A continues speaking (B didn't take the floor)
+                if A_continues:
+                    warnings.append("a_continues")
+            
+                warnings_str = "; ".join(warnings) if warnings else "ok"
+            
+                w.writerow(row_values({
+                    "doc": B.doc,
+                    "A_sent_id": A.sent_id,
+                    "A_speaker": A.speaker,
+                    "A_text": A.text,
+                    "A_sound_url": A.sound_url,
+                    "A_tokens": " ".join(A_forms),
+                    "A_pos_tags": " ".join(A_pos),
+                    "B_sent_id": B.sent_id,
+                    "B_speaker": B.speaker,
+                    "B_text": B.text,
+                    "B_sound_url": B.sound_url,
+                    "B_tokens": " ".join(B_forms),
+                    "B_pos_tags": " ".join(B_pos),
+                    "first_token_form": first_tok.form,
+                    "first_token_lemma": first_tok.lemma,
+                    "first_token_upos": first_tok.upos,
+                    "first_token_deprel": first_tok.deprel,
+                    "backchannel_type": bc_type,
+                    "B_token_count": len(B_forms),
+                    "B_has_verbal_bc": int(B_has_verbal_bc),
+                    "B_all_in_lexicon": int(B_all_in_lex),
+                    "A_is_question": int(A_is_question),
+                    "A_continues": int(A_continues),
+                    "warnings": warnings_str,
+                    "keep?": "",
+                }))
+                n_candidates += 1
     
-    print(f"Extracted {len(candidates)} candidates matching all criteria")
+    print(f"Parsed {n_sents} sentences from {path}")
+    print(f"Extracted {n_candidates} candidates matching all criteria")
     print(f"Wrote results to {out}")
 
 if __name__ == "__main__":
@@ -4,12 +4,17 @@ from __future__ import annotations
 import argparse
 import csv
 import re
-from collections import Counter, defaultdict
-from dataclasses import dataclass
+import sys
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+from itertools import chain
+from operator import itemgetter
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
 PUNCT_RE = re.compile(r"^\W+$", re.UNICODE)
+GREETING_PUNCT_TABLE = str.maketrans("", "", ".,!?")
 
 def load_lexicon_from_file(path: Path) -> Tuple[set[str], Dict[str, str]]:
     """Load lexicon from file with categories.
@@ -58,8 +63,7 @@ def load_greetings_from_file(path: Path) -> set[str]:
                 greetings.add(line)
     return greetings
 
-@dataclass
-class Token:
+class Token(NamedTuple):
     tid: int
     form: str
     lemma: str
@@ -67,8 +71,12 @@ class Token:
     head: Optional[int]
     deprel: str
     misc: str
+    # PUNCT upos, or a form made only of punctuation
+    is_punct: bool
+    # norm_form(form), interned so lexicon lookups can short-circuit on identity
+    form_lc: str
 
-@dataclass
+@dataclass(slots=True)
 class Sent:
     doc: str
     sent_id: str
@@ -76,6 +84,23 @@ class Sent:
     text: str
     sound_url: str
     tokens: List[Token]
+    # Non-punctuation tokens and their normalized forms, computed once here
+    # because nearly every helper below needs them for the same sentence.
+    nonpunct: List[Token] = field(init=False, repr=False)
+    forms_lc: List[str] = field(init=False, repr=False)
+    upos_counts: Counter[str] = field(init=False, repr=False)
+    has_discourse: bool = field(init=False, repr=False)
+    root_id: Optional[int] = field(init=False, repr=False)
+    # Lexicon-dependent flags, filled by mark_lexicon_hits once the lexicon is final.
+    lex_hits: int = field(init=False, default=0, repr=False)
+    backchannel_like: bool = field(init=False, default=False, repr=False)
+
+    def __post_init__(self):
+        self.nonpunct = [t for t in self.tokens if not t.is_punct]
+        self.forms_lc = [t.form_lc for t in self.nonpunct]
+        self.upos_counts = Counter(t.upos for t in self.nonpunct)
+        self.has_discourse = has_discourse_like_deprel(self)
+        self.root_id = sent_root_id(self)
 
 def parse_conllu(path: Path) -> List[Sent]:
     sents: List[Sent] = []
@@ -88,69 +113,60 @@ def parse_conllu(path: Path) -> List[Sent]:
         if not meta and not tokens:
             return
         if "newdoc id" in meta:
-            current_doc = meta["newdoc id"]
+            current_doc = sys.intern(meta["newdoc id"])
         sent_id = meta.get("sent_id", "")
-        speaker = meta.get("speaker_id", "")
+        speaker = sys.intern(meta.get("speaker_id", ""))
         text = meta.get("text", "")
         sound_url = meta.get("sound_url", "NA")
         sents.append(Sent(doc=current_doc, sent_id=sent_id, speaker=speaker, text=text, sound_url=sound_url, tokens=tokens))
         meta = {}
         tokens = []
 
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.rstrip("\n")
-            if not line:
-                flush()
-                continue
-            if line.startswith("#"):
-                if "=" in line:
-                    k, v = line[1:].split("=", 1)
-                    meta[k[1:].strip()] = v.strip()
-                continue
+    # Hot loop over every line of the corpus: keep it to local names,
+    # str methods and positional Token construction.
+    punct_match = PUNCT_RE.match
+    intern = sys.intern
+    for line in path.read_text(encoding="utf-8").split("\n"):
+        if not line:
+            flush()
+            continue
+        if line[0] == "#":
+            if "=" in line:
+                k, v = line[1:].split("=", 1)
+                meta[k[1:].strip()] = v.strip()
+            continue
 
-            cols = line.split("\t")
-            if len(cols) < 8:
-                continue
-            tid = cols[0]
-            # skip multiword tokens & empty nodes
-            if "-" in tid or "." in tid:
-                continue
-            try:
-                tid_i = int(tid)
-            except ValueError:
-                continue
+        cols = line.split("\t", 9)
+        if len(cols) < 8:
+            continue
+        tid = cols[0]
+        # skip multiword tokens ("1-2") & empty nodes ("1.1")
+        if not tid.isdecimal():
+            continue
 
+        # HEAD is numeric for every regular token; "_" is the rare exception
+        try:
+            head = int(cols[6])
+        except ValueError:
             head = None
-            if cols[6].isdigit():
-                head = int(cols[6])
-
-            misc = cols[9] if len(cols) > 9 else "_"
-            tokens.append(Token(
-                tid=tid_i,
-                form=cols[1],
-                lemma=cols[2],
-                upos=cols[3],
-                head=head,
-                deprel=cols[7],
-                misc=misc
-            ))
+
+        form = cols[1]
+        upos = intern(cols[3])
+        misc = cols[9] if len(cols) > 9 else "_"
+        # Token(tid, form, lemma, upos, head, deprel, misc, is_punct, form_lc)
+        tokens.append(Token(
+            int(tid), form, cols[2], upos, head, intern(cols[7]), misc,
+            # isalnum() rejects ordinary words in C before the regex runs
+            upos == "PUNCT" or (not form.isalnum() and punct_match(form.strip()) is not None),
+            intern(form.strip().lower()),
+        ))
 
     flush()
     return sents
 
-def is_punct(tok: Token) -> bool:
-    if tok.upos == "PUNCT":
-        return True
-    # also treat pure punctuation forms as punct
-    return bool(PUNCT_RE.match(tok.form.strip()))
-
 def norm_form(s: str) -> str:
     return s.strip().lower()
 
-def nonpunct_tokens(sent: Sent) -> List[Token]:
-    return [t for t in sent.tokens if not is_punct(t)]
-
 def sent_root_id(sent: Sent) -> Optional[int]:
     for t in sent.tokens:
         if t.head == 0:
@@ -159,22 +175,29 @@ def sent_root_id(sent: Sent) -> Optional[int]:
 
 def last_content_id(sent: Sent) -> Optional[int]:
     # heuristic: last token that is not punct and not a pure filler-like thing
-    toks = nonpunct_tokens(sent)
+    toks = sent.nonpunct
     if not toks:
         return None
     # prefer content POS near the end
     content_pos = {"NOUN", "PROPN", "VERB", "ADJ", "ADV", "NUM", "PRON"}
-    for t in reversed(toks):
-        if t.upos in content_pos and norm_form(t.form) not in {"eee", "em", "erm"}:
+    for t, f in zip(reversed(toks), reversed(sent.forms_lc)):
+        if t.upos in content_pos and f not in {"eee", "em", "erm"}:
             return t.tid
     # fallback: last nonpunct
     return toks[-1].tid
 
-def count_lexicon_hits(sent: Sent, lex: set[str]) -> Tuple[int, int, List[str]]:
-    toks = nonpunct_tokens(sent)
-    forms = [norm_form(t.form) for t in toks]
-    hits = sum(1 for f in forms if f in lex)
-    return hits, len(forms), forms
+def mark_lexicon_hits(sents: List[Sent], lex: frozenset[str]) -> None:
+    """Store per-sentence lexicon hit counts and the backchannel-like flag.
+
+    A sentence looks like a backchannel itself when it is short (1-3 tokens,
+    as backchannels typically are) and every token is in the lexicon, i.e.
+    its hit count equals its length.
+    """
+    is_lex = lex.__contains__
+    for s in sents:
+        n = len(s.forms_lc)
+        s.lex_hits = hits = sum(map(is_lex, s.forms_lc))
+        s.backchannel_like = 0 < n <= 3 and hits == n
 
 def determine_backchannel_type(forms: List[str], categories: Dict[str, str]) -> str:
     """Determine backchannel type from token forms.
@@ -204,24 +227,26 @@ def is_question_like(text: str) -> bool:
 
 def has_discourse_like_deprel(sent: Sent) -> bool:
     # used only as a weak positive signal (not a filter)
-    for t in sent.tokens:
-        if t.deprel.startswith("discourse"):
-            return True
-    return False
+    return any(t.deprel.startswith("discourse") for t in sent.tokens)
+
+def compile_greetings(greetings: set[str]) -> Optional[re.Pattern[str]]:
+    """Compile the greeting phrases into one alternation (None if the list is empty)."""
+    if not greetings:
+        return None
+    return re.compile("|".join(re.escape(g) for g in sorted(greetings)))
 
-def is_greeting_phrase(text: str, greetings: set[str]) -> bool:
-    """Check if text matches greeting phrases from exclusion list."""
-    normalized = norm_form(text)
+def is_greeting_phrase(text: str, greetings_re: Optional[re.Pattern[str]]) -> bool:
+    """Check if text contains any greeting phrase from the exclusion list."""
+    if greetings_re is None:
+        return False
     # Remove punctuation for comparison
-    normalized = normalized.replace(".", "").replace(",", "").replace("!", "").replace("?", "").strip()
-    return normalized in greetings or any(greeting in normalized for greeting in greetings)
+    normalized = norm_form(text).translate(GREETING_PUNCT_TABLE).strip()
+    return greetings_re.search(normalized) is not None
 
 def has_filler_markers(sent: Sent) -> bool:
     """Check if sentence contains filler/hesitation markers (eee, em, etc.)."""
-    toks = nonpunct_tokens(sent)
     filler_markers = {"eee", "eem", "em", "erm", "mmm"}
-    forms = [norm_form(t.form) for t in toks]
-    return any(f in filler_markers for f in forms)
+    return any(f in filler_markers for f in sent.forms_lc)
 
 def has_question_words(sent: Sent) -> bool:
     """Check if sentence contains Slovenian question words (kaj, kako, kdo, etc.).
@@ -231,9 +256,9 @@ def has_question_words(sent: Sent) -> bool:
     1. Single-word "kaj?" or "kako?" (including elongated forms like "kaaaj") - surprise/confusion markers
     2. "kako" + adjective/adverb patterns (e.g., "kako smešno", "vaa kako dober sok") - assessment exclamations
     """
-    toks = nonpunct_tokens(sent)
+    toks = sent.nonpunct
     question_words = {"kaj", "kako", "kdo", "kje", "kdaj", "zakaj", "kam", "kod", "čigav"}
-    forms = [norm_form(t.form) for t in toks]
+    forms = sent.forms_lc
     
     # If it's just a single word, check if it's an allowed exclamation form
     if len(forms) == 1:
@@ -245,8 +270,8 @@ def has_question_words(sent: Sent) -> bool:
     
     # Check for "kako + adjective/adverb" exclamation patterns (assessments, not questions)
     # Examples: "kako smešno" (how funny), "vaa kako dober sok" (wow how good juice)
-    for i, tok in enumerate(toks):
-        if norm_form(tok.form) == "kako":
+    for i, f in enumerate(forms):
+        if f == "kako":
             # Check if followed by adjective or adverb (assessment/exclamation)
             for j in range(i + 1, len(toks)):
                 if toks[j].upos in {"ADJ", "ADV"}:
@@ -256,45 +281,23 @@ def has_question_words(sent: Sent) -> bool:
     # Otherwise, filter if contains any question word
     return any(f in question_words for f in forms)
 
-def looks_like_backchannel(sent: Sent, lex: set[str]) -> bool:
-    """Check if sentence itself looks like a backchannel (short, lexicon match)."""
-    toks = nonpunct_tokens(sent)
-    if len(toks) == 0 or len(toks) > 3:  # backchannels are typically 1-3 tokens
-        return False
-    forms = [norm_form(t.form) for t in toks]
-    # All tokens should be in lexicon
-    return all(f in lex for f in forms)
-
 def has_content_structure(sent: Sent) -> bool:
     """Check if sentence has content words/structure that makes it NOT a backchannel."""
-    toks = nonpunct_tokens(sent)
-    
-    # Check for explicit content words first
-    has_verb = False
-    has_pron = False
-    for t in toks:
-        if t.upos == "VERB":
-            has_verb = True
-        if t.upos == "PRON":
-            has_pron = True
-        # Check for nouns (except when they're very short utterances like names)
-        if t.upos in {"NOUN", "PROPN"} and len(toks) > 2:
-            return True
-        # Check for adjectives in longer utterances
-        if t.upos == "ADJ" and len(toks) > 2:
-            return True
+    n = len(sent.nonpunct)
+    c = sent.upos_counts
     
-    # PRON + VERB combination suggests full clause (e.g., "jaz sem", "ti si")
-    if has_pron and has_verb:
+    # Check for nouns (except when they're very short utterances like names)
+    # and for adjectives in longer utterances
+    if n > 2 and (c["NOUN"] or c["PROPN"] or c["ADJ"]):
         return True
     
-    # Single VERB is content
-    if has_verb:
+    # Any VERB is content (PRON + VERB, e.g. "jaz sem", "ti si", is a full clause)
+    if c["VERB"]:
         return True
     
     # Fallback: if no content words detected but suspiciously long
     # Backchannels are typically 1-3 tokens per guidelines ("samostojno")
-    if len(toks) > 3:
+    if n > 3:
         return True
     
     return False
@@ -306,9 +309,9 @@ def is_question_requiring_answer(sent: Sent) -> bool:
         return False
     
     # Tag questions with just one token + "ne" are OK backchannels
-    toks = nonpunct_tokens(sent)
+    toks = sent.nonpunct
     if len(toks) <= 2:
-        forms = [norm_form(t.form) for t in toks]
+        forms = sent.forms_lc
         # "ne?" or "ja?" alone are OK
         if forms == ["ne"] or forms == ["ja"]:
             return False
@@ -322,32 +325,30 @@ def is_question_requiring_answer(sent: Sent) -> bool:
 def build_top_short_utterances(sents: List[Sent], max_tokens: int) -> Counter[str]:
     c = Counter()
     for s in sents:
-        toks = [norm_form(t.form) for t in nonpunct_tokens(s)]
+        toks = s.forms_lc
         if 0 < len(toks) <= max_tokens:
             key = " ".join(toks)
             c[key] += 1
     return c
 
-def find_next_same_speaker(sents: List[Sent], i: int, window: int) -> Optional[int]:
-    """Find next index j in (i+1..i+window) with same speaker as sents[i], same doc."""
-    base = sents[i]
-    for j in range(i + 1, min(len(sents), i + window + 1)):
-        if sents[j].doc != base.doc:
-            break
-        if sents[j].speaker == base.speaker:
-            return j
-    return None
-
-def is_near_end_of_doc(sents: List[Sent], i: int, k_end: int) -> bool:
-    """True if i is within last k_end utterances of its doc."""
-    doc = sents[i].doc
-    # find last index of this doc
-    j = i
-    last = i
-    while j < len(sents) and sents[j].doc == doc:
-        last = j
-        j += 1
-    return (last - i) <= k_end
+def build_next_same_speaker(sents: List[Sent]) -> array:
+    """For each i, the next index j > i with the same speaker as sents[i] in the same doc (or -1)."""
+    nxt = array("i", [-1]) * len(sents)
+    seen: Dict[str, int] = {}
+    for i in range(len(sents) - 1, -1, -1):
+        if i + 1 < len(sents) and sents[i + 1].doc != sents[i].doc:
+            seen.clear()
+        nxt[i] = seen.get(sents[i].speaker, -1)
+        seen[sents[i].speaker] = i
+    return nxt
+
+def build_dist_to_doc_end(sents: List[Sent]) -> array:
+    """For each i, how many utterances of its doc follow sents[i]."""
+    dist = array("i", bytes(4 * len(sents)))
+    for i in range(len(sents) - 2, -1, -1):
+        if sents[i + 1].doc == sents[i].doc:
+            dist[i] = dist[i + 1] + 1
+    return dist
 
 def compute_numeric_confidence(confidence: str, n_tok: int, warning_count: float, 
                                has_immediate_aba: bool, has_windowed_aba: bool,
@@ -402,83 +403,22 @@ def compute_numeric_confidence(confidence: str, n_tok: int, warning_count: float
     score = max(0.0, min(100.0, score))
     return int(round(score))
 
-def main():
-    ap = argparse.ArgumentParser(description="Extract backchannel candidates from SST corpus")
-    ap.add_argument("--input", default=None, help="Path to SST .conllu (default: src/sst/sl_sst-ud-merged.conllu)")
-    ap.add_argument("--output", default=None, help="Output CSV path (default: output/sst/backchannel_candidates.csv)")
-    ap.add_argument("--min_lex_hits", type=int, default=1, help="Minimum lexicon hits in B")
-    ap.add_argument("--window", type=int, default=5, help="Lookahead window for A…B…A continuation")
-    ap.add_argument("--end_k", type=int, default=2, help="Consider A-B near end of doc within this many turns")
-    ap.add_argument("--max_tokens", type=int, default=10,
-                    help="Max token length for short-utterance mining (used by --auto_top_short and --add_top_short_to_lexicon)")
-    ap.add_argument("--include_no_continuation", action="store_true",
-                    help="Also include short B even if we can't prove A continues")
-    ap.add_argument("--lexicon_file", default=None, help="Path to lexicon file (default: lexicon/sl_backchannels.txt)")
-    ap.add_argument("--greetings_file", default=None, help="Path to greetings exclusion file (default: lexicon/sl_greetings_exclude.txt)")
-    ap.add_argument("--auto_top_short", type=int, default=0,
-                    help="If >0, write top short utterances list to <output>.top_short.csv")
-    ap.add_argument("--add_top_short_to_lexicon", type=int, default=0,
-                    help="If >0, add the top N short-utterance tokens (single-token only) to lexicon to increase recall")
-    args = ap.parse_args()
-
-    # Set defaults relative to script location
-    script_dir = Path(__file__).parent
-    project_root = script_dir.parent
-    
-    if args.input is None:
-        args.input = str(project_root / "src" / "sst" / "sl_sst-ud-merged.conllu")
-    if args.output is None:
-        output_dir = project_root / "output" / "sst"
-        output_dir.mkdir(parents=True, exist_ok=True)
-        args.output = str(output_dir / "backchannel_candidates.csv")
-
-    path = Path(args.input)
-    sents = parse_conllu(path)
-
-    # Load lexicon from file with categories
-    lexicon_path = Path(args.lexicon_file) if args.lexicon_file else project_root / "lexicon" / "sl_backchannels.txt"
-    lex, categories = load_lexicon_from_file(lexicon_path)
-    if not lex:
-        print(f"Error: No lexicon loaded from {lexicon_path}. Please check the file exists.")
-        return
-    print(f"Loaded {len(lex)} lexicon words from {lexicon_path}")
-    print(f"Categories: {len([c for c in categories.values() if c != 'unspecified'])} categorized, {len([c for c in categories.values() if c == 'unspecified'])} uncategorized")
-    
-    # Load greetings exclusion list from file
-    greetings_path = Path(args.greetings_file) if args.greetings_file else project_root / "lexicon" / "sl_greetings_exclude.txt"
-    greeting_phrases = load_greetings_from_file(greetings_path)
-    print(f"Loaded {len(greeting_phrases)} greeting exclusions from {greetings_path}")
-
-    # optional: build top short utterances
-    if args.auto_top_short > 0:
-        top = build_top_short_utterances(sents, max_tokens=args.max_tokens)
-        out_top = Path(args.output).with_suffix("")  # strip .csv if present
-        out_top = Path(str(out_top) + ".top_short.csv")
-        with out_top.open("w", encoding="utf-8", newline="") as f:
-            w = csv.writer(f)
-            w.writerow(["utterance_tokens", "count"])
-            for utt, cnt in top.most_common(args.auto_top_short):
-                w.writerow([utt, cnt])
-
-    if args.add_top_short_to_lexicon > 0:
-        top = build_top_short_utterances(sents, max_tokens=args.max_tokens)
-        added = 0
-        for utt, _ in top.most_common():
-            toks = utt.split()
-            if len(toks) == 1 and toks[0] not in lex:
-                lex.add(toks[0])
-                added += 1
-                if added >= args.add_top_short_to_lexicon:
-                    break
-
-    # aggregate results per B_sent_id (so one row per B even if multiple reasons)
-    rows_by_b: Dict[str, dict] = {}
-    reasons_by_b: Dict[str, set] = defaultdict(set)
-
-    for i in range(len(sents)):
-        if i == 0:
-            continue
+def iter_candidates(start: int, stop: int, sents: List[Sent], args: argparse.Namespace,
+                    greetings_re: Optional[re.Pattern[str]], categories: Dict[str, str],
+                    next_same_speaker: array, dist_to_doc_end: array) -> Iterator[dict]:
+    """Yield a candidate row for each A-B pair (sents[i-1], sents[i]) with start <= i < stop.
 
+    Only reads sents and the precomputed per-index tables, so disjoint
+    [start, stop) ranges can be mined independently (see --jobs).
+    """
+    # options read on every pair, looked up once
+    min_lex_hits = args.min_lex_hits
+    window = args.window
+    end_k = args.end_k
+    include_no_continuation = args.include_no_continuation
+    n_sents = len(sents)
+
+    for i in range(start, stop):
         A = sents[i - 1]
         B = sents[i]
         if A.doc != B.doc:
@@ -490,19 +430,17 @@ def main():
         if A.speaker == B.speaker:
             continue  # backchannels are typically other-speaker
 
-        hits, n_tok, forms = count_lexicon_hits(B, lex)
-        if n_tok == 0:
+        # Hard filters, cheapest first:
+        # Skip if B is empty or 6+ tokens (violates "samostojno" guideline - not minimal)
+        n_tok = len(B.forms_lc)
+        if n_tok == 0 or n_tok >= 6:
             continue
-        if hits < args.min_lex_hits:
+        if B.lex_hits < min_lex_hits:
             continue
+        forms = B.forms_lc
         
-        # Hard filters:
         # Skip if B is a greeting phrase
-        if is_greeting_phrase(B.text, greeting_phrases):
-            continue
-        
-        # Skip if B is 6+ tokens (violates "samostojno" guideline - not minimal)
-        if n_tok >= 6:
+        if is_greeting_phrase(B.text, greetings_re):
             continue
         
         # Skip if B contains question words (kaj, kako, kdo, etc.) - these are content questions, not backchannels
@@ -510,7 +448,7 @@ def main():
             continue
         
         # Compute flags (soft filters for manual review)
-        A_is_backchannel_like = looks_like_backchannel(A, lex)
+        A_is_backchannel_like = A.backchannel_like
         A_is_q = is_question_like(A.text)
         B_has_content = has_content_structure(B)
         B_is_multi_token_q = is_question_requiring_answer(B)
@@ -528,7 +466,7 @@ def main():
 
         # immediate ABA - strongest evidence
         has_immediate_aba = False
-        if i + 1 < len(sents):
+        if i + 1 < n_sents:
             C = sents[i + 1]
             if C.doc == B.doc and C.speaker == A.speaker:
                 why_parts.append("A continues immediately after B")
@@ -537,29 +475,30 @@ def main():
 
         # windowed A…B…A
         has_windowed_aba = False
-        j = find_next_same_speaker(sents, i - 1, window=args.window)
-        if j is not None and j > i:
+        # -1 (no later turn by A in this doc) fails i < j
+        j = next_same_speaker[i - 1]
+        if i < j <= i - 1 + window:
             if not has_immediate_aba:
-                why_parts.append(f"A continues within {args.window} turns")
+                why_parts.append(f"A continues within {window} turns")
                 has_windowed_aba = True
                 if base_confidence != "HIGH":
                     base_confidence = "MEDIUM"
 
         # near end of doc A-B (note but don't auto-upgrade)
-        at_end = is_near_end_of_doc(sents, i, k_end=args.end_k)
+        at_end = dist_to_doc_end[i] <= end_k
         if at_end:
             why_parts.append("Near end of conversation")
             # Don't auto-upgrade - near end doesn't prove backchannel status
 
         # No continuation evidence
         if not why_parts:
-            if not args.include_no_continuation:
+            if not include_no_continuation:
                 continue
             why_parts.append("Short B with lexicon match, no continuation proof")
             base_confidence = "LOW"
 
         # weak syntactic clue
-        if has_discourse_like_deprel(B):
+        if B.has_discourse:
             why_parts.append("has discourse relation")
         
         # DOWN-GRADE confidence based on warning flags
@@ -609,9 +548,7 @@ def main():
         )
 
         # flags
-        A_root = sent_root_id(A)
-
-        B_is_q = is_question_like(B.text)
+        A_root = A.root_id
 
         proposed_root = f"{A.sent_id}::{A_root}" if A_root is not None else ""
         why_candidate = "; ".join(why_parts)
@@ -627,44 +564,149 @@ def main():
                 A_forms.append(tok.form)
                 A_pos.append(tok.upos if hasattr(tok, 'upos') else '_')
         
-        row = rows_by_b.get(B.sent_id)
-        if row is None:
-            rows_by_b[B.sent_id] = {
-                "doc": B.doc,
-                "confidence": confidence,
-                "confidence_score": numeric_confidence,
-                "backchannel_type": bc_type,
-                "A_sent_id": A.sent_id,
-                "A_speaker": A.speaker,
-                "A_text": A.text,
-                "A_sound_url": A.sound_url,
-                "A_tokens": " ".join(A_forms),
-                "A_pos_tags": " ".join(A_pos),
-                "B_sent_id": B.sent_id,
-                "B_speaker": B.speaker,
-                "B_text": B.text,
-                "B_sound_url": B.sound_url,
-                "B_tokens": " ".join(forms),
-                "B_token_count": n_tok,
-                "why_candidate": why_candidate,
-                "A_looks_like_backchannel": int(A_is_backchannel_like),
-                "B_has_content": int(B_has_content),
-                "B_is_question": int(B_is_multi_token_q),
-                "B_after_question": int(B_after_question),
-                "proposed_attach_root": proposed_root,
-"keep?": "",
-            }
-        else:
-            # merge if we hit same B again (should be rare), keep best confidence
-            if confidence == "HIGH":
-                rows_by_b[B.sent_id]["confidence"] = "HIGH"
-            elif confidence == "MEDIUM" and rows_by_b[B.sent_id]["confidence"] == "LOW":
-                rows_by_b[B.sent_id]["confidence"] = "MEDIUM"
-            # append why_candidate
-            if why_candidate not in rows_by_b[B.sent_id]["why_candidate"]:
-                rows_by_b[B.sent_id]["why_candidate"] += " | " + why_candidate
-
-    # write CSV
+        yield {
+            "doc": B.doc,
+            "confidence": confidence,
+            "confidence_score": numeric_confidence,
+            "backchannel_type": bc_type,
+            "A_sent_id": A.sent_id,
+            "A_speaker": A.speaker,
+            "A_text": A.text,
+            "A_sound_url": A.sound_url,
+            "A_tokens": " ".join(A_forms),
+            "A_pos_tags": " ".join(A_pos),
+            "B_sent_id": B.sent_id,
+            "B_speaker": B.speaker,
+            "B_text": B.text,
+            "B_sound_url": B.sound_url,
+            "B_tokens": " ".join(forms),
+            "B_token_count": n_tok,
+            "why_candidate": why_candidate,
+            "A_looks_like_backchannel": int(A_is_backchannel_like),
+            "B_has_content": int(B_has_content),
+            "B_is_question": int(B_is_multi_token_q),
+            "B_after_question": int(B_after_question),
+            "proposed_attach_root": proposed_root,
+            "keep?": "",
+        }
+
+# Read-only inputs of iter_candidates, installed once per --jobs worker.
+_WORKER_STATE: tuple = ()
+
+def _init_worker(*state) -> None:
+    global _WORKER_STATE
+    _WORKER_STATE = state
+
+def _mine_range(bounds: Tuple[int, int]) -> List[dict]:
+    return list(iter_candidates(*bounds, *_WORKER_STATE))
+
+def main():
+    ap = argparse.ArgumentParser(description="Extract backchannel candidates from SST corpus")
+    ap.add_argument("--input", default=None, help="Path to SST .conllu (default: src/sst/sl_sst-ud-merged.conllu)")
+    ap.add_argument("--output", default=None, help="Output CSV path (default: output/sst/backchannel_candidates.csv)")
+    ap.add_argument("--min_lex_hits", type=int, default=1, help="Minimum lexicon hits in B")
+    ap.add_argument("--window", type=int, default=5, help="Lookahead window for A…B…A continuation")
+    ap.add_argument("--end_k", type=int, default=2, help="Consider A-B near end of doc within this many turns")
+    ap.add_argument("--max_tokens", type=int, default=10,
+                    help="Max token length for short-utterance mining (used by --auto_top_short and --add_top_short_to_lexicon)")
+    ap.add_argument("--include_no_continuation", action="store_true",
+                    help="Also include short B even if we can't prove A continues")
+    ap.add_argument("--lexicon_file", default=None, help="Path to lexicon file (default: lexicon/sl_backchannels.txt)")
+    ap.add_argument("--greetings_file", default=None, help="Path to greetings exclusion file (default: lexicon/sl_greetings_exclude.txt)")
+    ap.add_argument("--auto_top_short", type=int, default=0,
+                    help="If >0, write top short utterances list to <output>.top_short.csv")
+    ap.add_argument("--add_top_short_to_lexicon", type=int, default=0,
+                    help="If >0, add the top N short-utterance tokens (single-token only) to lexicon to increase recall")
+    ap.add_argument("--jobs", type=int, default=1,
+                    help="Worker processes for candidate mining (default: 1; only pays off on corpora much larger than SST)")
+    args = ap.parse_args()
+    if args.window < 0:
+        ap.error("--window must be >= 0")
+    if args.end_k < 0:
+        ap.error("--end_k must be >= 0")
+    if args.max_tokens < 1:
+        ap.error("--max_tokens must be >= 1")
+    if args.jobs < 1:
+        ap.error("--jobs must be >= 1")
+
+    # Set defaults relative to script location
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+    
+    if args.input is None:
+        args.input = str(project_root / "src" / "sst" / "sl_sst-ud-merged.conllu")
+    if args.output is None:
+        output_dir = project_root / "output" / "sst"
+        output_dir.mkdir(parents=True, exist_ok=True)
+        args.output = str(output_dir / "backchannel_candidates.csv")
+
+    path = Path(args.input)
+    sents = parse_conllu(path)
+
+    # Load lexicon from file with categories
+    lexicon_path = Path(args.lexicon_file) if args.lexicon_file else project_root / "lexicon" / "sl_backchannels.txt"
+    lex, categories = load_lexicon_from_file(lexicon_path)
+    if not lex:
+        print(f"Error: No lexicon loaded from {lexicon_path}. Please check the file exists.")
+        return
+    print(f"Loaded {len(lex)} lexicon words from {lexicon_path}")
+    print(f"Categories: {len([c for c in categories.values() if c != 'unspecified'])} categorized, {len([c for c in categories.values() if c == 'unspecified'])} uncategorized")
+    
+    # Load greetings exclusion list from file
+    greetings_path = Path(args.greetings_file) if args.greetings_file else project_root / "lexicon" / "sl_greetings_exclude.txt"
+    greeting_phrases = load_greetings_from_file(greetings_path)
+    print(f"Loaded {len(greeting_phrases)} greeting exclusions from {greetings_path}")
+    greetings_re = compile_greetings(greeting_phrases)
+
+    # optional: build top short utterances
+    top = None
+    if args.auto_top_short > 0:
+        top = build_top_short_utterances(sents, max_tokens=args.max_tokens)
+        out_top = Path(args.output).with_suffix("")  # strip .csv if present
+        out_top = Path(str(out_top) + ".top_short.csv")
+        with out_top.open("w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["utterance_tokens", "count"])
+            for utt, cnt in top.most_common(args.auto_top_short):
+                w.writerow([utt, cnt])
+
+    if args.add_top_short_to_lexicon > 0:
+        # Only single-token utterances are merged into the lexicon; reuse the
+        # list built above if there is one, otherwise count single tokens only
+        # (their order in most_common() is the same either way).
+        if top is None:
+            top = build_top_short_utterances(sents, max_tokens=1)
+        added = 0
+        for utt, _ in top.most_common():
+            toks = utt.split()
+            if len(toks) == 1 and toks[0] not in lex:
+                lex.add(toks[0])
+                added += 1
+                if added >= args.add_top_short_to_lexicon:
+                    break
+
+    lex = frozenset(map(sys.intern, lex))
+    mark_lexicon_hits(sents, lex)
+
+    next_same_speaker = build_next_same_speaker(sents)
+    dist_to_doc_end = build_dist_to_doc_end(sents)
+
+    state = (sents, args, greetings_re, categories, next_same_speaker, dist_to_doc_end)
+    if args.jobs > 1 and len(sents) > 1:
+        # Every pair only looks at its neighbours through the global tables
+        # above, so the index range can be cut anywhere.
+        from concurrent.futures import ProcessPoolExecutor
+
+        step = -(-(len(sents) - 1) // args.jobs)
+        bounds = [(lo, min(lo + step, len(sents))) for lo in range(1, len(sents), step)]
+        with ProcessPoolExecutor(max_workers=len(bounds), initializer=_init_worker, initargs=state) as ex:
+            candidates = chain.from_iterable(list(ex.map(_mine_range, bounds)))
+    else:
+        candidates = iter_candidates(1, len(sents), *state)
+
+    # Rows are written as soon as they are found (one row per B_sent_id).
+    # Only B_sent_id -> [confidence, why_candidate] is kept, so that a B hit
+    # a second time can be merged into its row by one rewrite at the end.
     out = Path(args.output)
     fieldnames = [
         "doc", "confidence", "confidence_score", "backchannel_type",
@@ -675,13 +717,49 @@ def main():
         "proposed_attach_root",
         "keep?"
     ]
-    with out.open("w", encoding="utf-8", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-        for b_sent_id, row in rows_by_b.items():
-            w.writerow(row)
+    written: Dict[str, List[str]] = {}
+    merged_b: set[str] = set()
 
-    print(f"Wrote {len(rows_by_b)} candidates to {out}")
+    # rows are plain csv.writer lists in fieldnames order (no per-row DictWriter checks)
+    row_values = itemgetter(*fieldnames)
+
+    with out.open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(fieldnames)
+
+        for row in candidates:
+            b_sent_id = row["B_sent_id"]
+            confidence = row["confidence"]
+            why_candidate = row["why_candidate"]
+            seen = written.get(b_sent_id)
+            if seen is None:
+                written[b_sent_id] = [confidence, why_candidate]
+                w.writerow(row_values(row))
+            else:
+                # merge if we hit same B again (should be rare), keep best confidence;
+                # the row is already written, so it is patched after the loop
+                if confidence == "HIGH":
+                    seen[0] = "HIGH"
+                elif confidence == "MEDIUM" and seen[0] == "LOW":
+                    seen[0] = "MEDIUM"
+                # append why_candidate
+                if why_candidate not in seen[1]:
+                    seen[1] += " | " + why_candidate
+                merged_b.add(b_sent_id)
+
+    if merged_b:
+        b_col = fieldnames.index("B_sent_id")
+        conf_col = fieldnames.index("confidence")
+        why_col = fieldnames.index("why_candidate")
+        with out.open("r", encoding="utf-8", newline="") as f:
+            rows = list(csv.reader(f))
+        for row in rows[1:]:
+            if row[b_col] in merged_b:
+                row[conf_col], row[why_col] = written[row[b_col]]
+        with out.open("w", encoding="utf-8", newline="") as f:
+            csv.writer(f).writerows(rows)
+
+    print(f"Wrote {len(written)} candidates to {out}")
 
 if __name__ == "__main__":
     main()
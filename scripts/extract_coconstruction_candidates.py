@@ -17,15 +17,28 @@ from __future__ import annotations
 
 import argparse
 import csv
+import re
+import sys
+from collections import deque
 from dataclasses import dataclass
+from itertools import chain
+from operator import itemgetter
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import Deque, Dict, FrozenSet, Iterator, List, Optional, Set
 
 
-SENT_END_PUNCT = {".", "?", "!", "…"}
+SENT_END_PUNCT = frozenset({".", "?", "!", "…"})
 # Fillers often start noisy B turns but are not always in the lexicon.
-EXTRA_NOISY_STARTERS = {"eee", "eem", "hm", "hmm", "uh", "uhh"}
-FILLER_FORMS = {"e", "ee", "eee", "eem", "em", "emm", "hm", "hmm", "uh", "uhh"}
+EXTRA_NOISY_STARTERS = frozenset({"eee", "eem", "hm", "hmm", "uh", "uhh"})
+FILLER_FORMS = frozenset({"e", "ee", "eee", "eem", "em", "emm", "hm", "hmm", "uh", "uhh"})
+INTJ_PART_UPOS = frozenset({"INTJ", "PART"})
+# Whitespace-delimited words, scanned lazily by first_text_token
+WORD_RE = re.compile(r"\S+")
+
+# Byte constants for the CoNLL-U scanner
+HASH = ord("#")
+EQ = b"="
+TAB = b"\t"
 
 
 # ---------------------------------------------------------------------------
@@ -33,7 +46,7 @@ FILLER_FORMS = {"e", "ee", "eee", "eem", "em", "emm", "hm", "hmm", "uh", "uhh"}
 # ---------------------------------------------------------------------------
 
 
-@dataclass
+@dataclass(slots=True)
 class Token:
     tid: int
     form: str
@@ -44,7 +57,7 @@ class Token:
     misc: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Sent:
     doc: str
     sent_id: str
@@ -59,70 +72,66 @@ class Sent:
 # ---------------------------------------------------------------------------
 
 
-def parse_conllu(path: Path) -> List[Sent]:
-    """Parse a CoNLL-U file into a list of Sent objects."""
-    sents: List[Sent] = []
+def iter_conllu(path: Path) -> Iterator[Sent]:
+    """Parse a CoNLL-U file, yielding one Sent at a time."""
     meta: Dict[str, str] = {}
     tokens: List[Token] = []
     current_doc: str = ""
-
-    def flush() -> None:
-        nonlocal meta, tokens, current_doc
-        if not meta and not tokens:
-            return
-        if "newdoc id" in meta:
-            current_doc = meta["newdoc id"]
-        sents.append(
-            Sent(
-                doc=current_doc,
-                sent_id=meta.get("sent_id", ""),
-                speaker=meta.get("speaker_id", ""),
-                text=meta.get("text", ""),
-                sound_url=meta.get("sound_url", "NA"),
-                tokens=tokens,
-            )
-        )
-        meta = {}
-        tokens = []
-
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.rstrip("\n")
+    # doc/speaker IDs and UPOS/DEPREL tags repeat heavily; share one string each
+    intern = sys.intern
+
+    # Scan the raw bytes and decode only the columns kept on each Token;
+    # ID/HEAD are parsed straight from bytes (int() accepts them).
+    # The trailing empty line flushes a last sentence without a blank line after it.
+    with path.open("rb") as f:
+        for line in chain(f, (b"\n",)):
+            line = line.rstrip(b"\r\n")
             if not line:
-                flush()
+                if not meta and not tokens:
+                    continue
+                if "newdoc id" in meta:
+                    current_doc = intern(meta["newdoc id"])
+                yield Sent(
+                    doc=current_doc,
+                    sent_id=meta.get("sent_id", ""),
+                    speaker=intern(meta.get("speaker_id", "")),
+                    text=meta.get("text", ""),
+                    sound_url=meta.get("sound_url", "NA"),
+                    tokens=tokens,
+                )
+                meta = {}
+                tokens = []
                 continue
-            if line.startswith("#"):
-                if "=" in line:
-                    k, v = line[1:].split("=", 1)
+            if line[0] == HASH:
+                if EQ in line:
+                    k, v = line[1:].decode("utf-8").split("=", 1)
                     meta[k.strip()] = v.strip()
                 continue
 
-            cols = line.split("\t")
+            cols = line.split(TAB, 9)
             if len(cols) < 8:
                 continue
-            tid_str = cols[0]
-            if "-" in tid_str or "." in tid_str:
+            tid_b = cols[0]
+            if not tid_b.isdigit():
                 continue
+
+            # HEAD is numeric for every regular token; "_" is the rare exception
             try:
-                tid_i = int(tid_str)
+                head = int(cols[6])
             except ValueError:
-                continue
-
-            head = int(cols[6]) if cols[6].isdigit() else None
-            misc = cols[9] if len(cols) > 9 else "_"
+                head = None
+            misc = cols[9].decode("utf-8") if len(cols) > 9 else "_"
             tokens.append(
                 Token(
-                    tid=tid_i,
-                    form=cols[1],
-                    lemma=cols[2],
-                    upos=cols[3],
+                    tid=int(tid_b),
+                    form=cols[1].decode("utf-8"),
+                    lemma=cols[2].decode("utf-8"),
+                    upos=intern(cols[3].decode("utf-8")),
                     head=head,
-                    deprel=cols[7],
+                    deprel=intern(cols[7].decode("utf-8")),
                     misc=misc,
                 )
             )
-    flush()
-    return sents
 
 
 # ---------------------------------------------------------------------------
@@ -142,19 +151,19 @@ def content_tokens(sent: Sent) -> List[Token]:
 
 def first_text_token(text: str) -> str:
     """Return first normalized token from raw sentence text."""
-    for tok in text.split():
-        norm = normalize_word(tok)
+    for m in WORD_RE.finditer(text):
+        norm = normalize_word(m.group())
         if norm:
             return norm
     return ""
 
 
-def load_backchannel_lexicon(path: Path) -> Set[str]:
-    """Load `word|category` style lexicon, return only words."""
+def load_backchannel_lexicon(path: Path) -> FrozenSet[str]:
+    """Load `word|category` style lexicon, return only words (interned)."""
     words: Set[str] = set()
     if not path.exists():
         print(f"Warning: Backchannel lexicon not found at {path}")
-        return words
+        return frozenset()
     with path.open("r", encoding="utf-8") as f:
         for raw in f:
             line = raw.strip()
@@ -163,7 +172,7 @@ def load_backchannel_lexicon(path: Path) -> Set[str]:
             word = line.split("|", 1)[0].strip().lower()
             if word:
                 words.add(word)
-    return words
+    return frozenset(map(sys.intern, words))
 
 
 def load_annotated_backchannels(path: Path) -> Set[str]:
@@ -222,16 +231,24 @@ def sig_no_final_punct(a: Sent) -> bool:
 
 def sig_orphan_tail(a: Sent) -> bool:
     """A has an 'orphan' dependency among last 3 content tokens."""
-    ct = content_tokens(a)
-    if not ct:
-        return False
-    return any(tok.deprel == "orphan" for tok in ct[-3:])
+    # Walk back from the end so only the tail of A is ever looked at
+    seen = 0
+    for tok in reversed(a.tokens):
+        if tok.upos == "PUNCT":
+            continue
+        if tok.deprel == "orphan":
+            return True
+        seen += 1
+        if seen == 3:
+            break
+    return False
 
 
 def is_filler_token(tok: Token) -> bool:
     """Return True for filler-like tokens (incl. discourse:filler annotation)."""
-    form = normalize_word(tok.form)
-    return tok.deprel == "discourse:filler" or form in FILLER_FORMS
+    if tok.deprel == "discourse:filler":
+        return True
+    return normalize_word(tok.form) in FILLER_FORMS
 
 
 # ---------------------------------------------------------------------------
@@ -293,9 +310,6 @@ def main() -> None:
     print(f"Loaded {len(backchannel_lexicon)} lexicon entries from {lex_path}")
 
     path = Path(args.input)
-    sents = parse_conllu(path)
-    print(f"Parsed {len(sents)} sentences from {path}")
-
     candidates: List[dict] = []
 
     total_diff_pairs = 0
@@ -304,9 +318,18 @@ def main() -> None:
     dropped_first_filler = 0
     dropped_only_filler = 0
 
-    for i in range(len(sents) - 1):
-        a = sents[i]
-        b = sents[i + 1]
+    # Only A, B and the sentence after B are ever looked at, so sentences
+    # are streamed through a three-slot window instead of held in a list.
+    n_sents = 0
+    window: Deque[Optional[Sent]] = deque([None, None], maxlen=3)
+
+    for sent in chain(iter_conllu(path), (None,)):
+        window.append(sent)
+        if sent is not None:
+            n_sents += 1
+        a, b, c = window
+        if a is None or b is None:
+            continue
 
         # Hard filter 1: AB in same doc with speaker change.
         if a.doc != b.doc:
@@ -334,7 +357,8 @@ def main() -> None:
             continue
 
         first_is_filler = is_filler_token(b_ct[0])
-        only_fillers = all(is_filler_token(tok) for tok in b_ct)
+        # the first token was just classified; only the rest need checking
+        only_fillers = first_is_filler and all(is_filler_token(tok) for tok in b_ct[1:])
 
         # Hard filter 4: B consists only of filler tokens.
         if only_fillers:
@@ -348,16 +372,14 @@ def main() -> None:
 
         ort = sig_orphan_tail(a)
         a_continues = 0
-        if i + 2 < len(sents):
-            c = sents[i + 2]
-            if c.doc == a.doc and c.speaker == a.speaker:
-                a_continues = 1
+        if c is not None and c.doc == a.doc and c.speaker == a.speaker:
+            a_continues = 1
 
         b_root = root_token(b)
         b_first_token = first_text_token(b.text)
         b_has_question = "?" in b.text
         b_starts_backchannel_like = b_first_token in noisy_starters
-        b_root_is_intj_part = int(bool(b_root and b_root.upos in {"INTJ", "PART"}))
+        b_root_is_intj_part = int(bool(b_root and b_root.upos in INTJ_PART_UPOS))
 
         candidates.append(
             {
@@ -387,7 +409,7 @@ def main() -> None:
             }
         )
 
-    candidates.sort(key=lambda row: row["len"])
+    candidates.sort(key=itemgetter("len"))
 
     out = Path(args.output)
     fieldnames = [
@@ -416,12 +438,15 @@ def main() -> None:
         "notes",
     ]
 
+    # Rows are written as plain sequences in fieldname order; the dicts are
+    # kept for the summary counts below.
+    row_values = itemgetter(*fieldnames)
     with out.open("w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in candidates:
-            writer.writerow(row)
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        writer.writerows(map(row_values, candidates))
 
+    print(f"Parsed {n_sents} sentences from {path}")
     print(f"\nConsecutive AB pairs:                 {total_diff_pairs:4d}")
     print(f"A unfinished (hard filter):           {unfinished_pairs:4d}")
     print(f"Dropped due annotated backchannel:    {dropped_backchannel:4d}")
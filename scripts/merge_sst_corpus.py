@@ -4,6 +4,7 @@ Script to merge all CoNLL-U files from src/sst directory into a single corpus fi
 """
 
 import os
+import shutil
 from pathlib import Path
 
 
@@ -15,10 +16,13 @@ def merge_conllu_files(input_dir, output_file):
         input_dir: Directory containing .conllu files
         output_file: Path to the output merged corpus file
     """
-    input_path = Path(input_dir)
-    
-    # Get all .conllu files sorted by name
-    conllu_files = sorted(input_path.glob("*.conllu"))
+    # Get all .conllu files sorted by name; scandir reports the entry type
+    # without an extra stat() per file
+    with os.scandir(input_dir) as it:
+        conllu_files = sorted(
+            (e for e in it if e.name.endswith(".conllu") and e.is_file()),
+            key=lambda e: e.name,
+        )
     
     if not conllu_files:
         print(f"No .conllu files found in {input_dir}")
@@ -28,23 +32,27 @@ def merge_conllu_files(input_dir, output_file):
     for file in conllu_files:
         print(f"  - {file.name}")
     
-    # Merge files
-    with open(output_file, 'w', encoding='utf-8') as outf:
+    # Merge files. Inputs are copied as raw bytes in 1 MiB chunks, so no file
+    # is ever decoded or held in memory whole.
+    with open(output_file, 'wb') as outf:
         for i, file_path in enumerate(conllu_files):
             print(f"Processing {file_path.name}...")
             
-            with open(file_path, 'r', encoding='utf-8') as inf:
-                content = inf.read()
-                outf.write(content)
+            with open(file_path, 'rb') as inf:
+                shutil.copyfileobj(inf, outf, 1 << 20)
                 
                 # Add a blank line between files if not already present
                 # and if this is not the last file
                 if i < len(conllu_files) - 1:
-                    if not content.endswith('\n\n'):
-                        if content.endswith('\n'):
-                            outf.write('\n')
+                    # Only the last few bytes matter; CR is ignored so CRLF
+                    # files are treated like LF ones
+                    inf.seek(max(inf.tell() - 4, 0))
+                    tail = inf.read().replace(b'\r', b'')
+                    if not tail.endswith(b'\n\n'):
+                        if tail.endswith(b'\n'):
+                            outf.write(b'\n')
                         else:
-                            outf.write('\n\n')
+                            outf.write(b'\n\n')
     
     print(f"\nSuccessfully merged {len(conllu_files)} files into: {output_file}")
 